@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Benchmarks of :class:`paperweight.document.TexDocument` analytics.
+
+The outline and concordance of a document are cached on its shared text
+buffer (see :mod:`paperweight.textstore`), so benchmarks of section
+scanning and citation context extraction build them inside the timed
+method, from a text that no document in the benchmark holds.
+"""
+
+from paperweight.document import TexDocument
+from paperweight.outline import Outline
+
+from .generators import make_document
+
+
+def _uncached(text):
+    """A copy of ``text`` (with a trailing newline) that is not in the
+    text store while documents of ``text`` are alive.
+    """
+    return text + u'\n'
+
+
+class CitationSuite(object):
+    """Citation analytics as a function of the number of citations."""
+    params = [[10, 50, 200]]
+    param_names = ['n_citations']
+    timeout = 300
+
+    def setup(self, n_citations):
+        text = make_document(n_sections=10, n_paragraphs=5,
+                             n_citations=n_citations)
+        self.doc = TexDocument(text)
+        self.text = _uncached(text)
+
+    def time_extract_citation_context(self, n_citations):
+        TexDocument(self.text).extract_citation_context()
+
+    def time_bib_keys(self, n_citations):
+        self.doc.bib_keys
+
+
+class SectionSuite(object):
+    """Section scanning as a function of the number of sections."""
+    params = [[5, 20, 80]]
+    param_names = ['n_sections']
+    timeout = 300
+
+    def setup(self, n_sections):
+        self.text = make_document(n_sections=n_sections, n_paragraphs=2,
+                                  n_citations=0)
+
+    def time_sections(self, n_sections):
+        Outline(self.text).entries
+
+
+class DocumentSizeSuite(object):
+    """Document analytics as a function of document size (words per
+    paragraph, with a fixed number of sections and citations).
+    """
+    params = [[50, 200, 800]]
+    param_names = ['n_words']
+    timeout = 300
+
+    def setup(self, n_words):
+        text = make_document(n_sections=10, n_paragraphs=5, n_citations=20,
+                             n_words=n_words)
+        self.doc = TexDocument(text)
+        self.text = _uncached(text)
+
+    def time_sections(self, n_words):
+        Outline(self.text).entries
+
+    def time_extract_citation_context(self, n_words):
+        TexDocument(self.text).extract_citation_context()
+
+    def time_bib_keys(self, n_words):
+        self.doc.bib_keys
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Benchmarks of reading documents from git repositories, as a function of
+the length of the repository's history.
+"""
+
+import os
+
+from paperweight import gitio, texutils
+from paperweight.document import GitTexDocument
+
+from .generators import make_git_repo
+
+
+HISTORY_LENGTHS = [10, 100, 500]
+
+
+class GitSuite(object):
+    params = [HISTORY_LENGTHS]
+    param_names = ['n_commits']
+    timeout = 600
+
+    def setup_cache(self):
+        # Repositories are built once, in asv's cache directory
+        repos = {}
+        for n_commits in HISTORY_LENGTHS:
+            repo_dir = os.path.abspath('repo_{0:d}'.format(n_commits))
+            os.makedirs(repo_dir)
+            shas = make_git_repo(repo_dir, n_commits=n_commits, depth=2,
+                                 n_inputs=3)
+            repos[n_commits] = (repo_dir, shas)
+        return repos
+
+    def setup(self, repos, n_commits):
+        self.repo_dir, shas = repos[n_commits]
+        # The oldest commit is the deepest in the history
+        self.sha = shas[0]
+        self.root_text = gitio.read_git_blob(self.sha, 'main.tex',
+                                             repo_dir=self.repo_dir)
+
+    def time_read_git_blob(self, repos, n_commits):
+        gitio.read_git_blob(self.sha, 'sections/s0.tex',
+                            repo_dir=self.repo_dir)
+
+    def time_read_git_blob_cold(self, repos, n_commits):
+        gitio.clear_cache()
+        gitio.read_git_blob(self.sha, 'sections/s0.tex',
+                            repo_dir=self.repo_dir)
+
+    def time_inline_blob(self, repos, n_commits):
+        texutils.inline_blob(self.sha, self.root_text, base_dir='',
+                             repo_dir=self.repo_dir)
+
+    def time_git_tex_document(self, repos, n_commits):
+        GitTexDocument('main.tex', self.sha, repo_dir=self.repo_dir)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Benchmarks of :mod:`paperweight.texutils`.
+"""
+
+import os
+import shutil
+import tempfile
+import codecs
+
+from paperweight import texutils, texpath
+from paperweight.document import FilesystemTexDocument
+from paperweight.batch import inline_paths
+
+from .generators import make_document, make_body, make_project
+
+
+class RemoveCommentsSuite(object):
+    """Comment stripping as a function of document size."""
+    params = [[10, 100, 1000]]
+    param_names = ['n_paragraphs']
+
+    def setup(self, n_paragraphs):
+        self.text = make_document(n_sections=1, n_paragraphs=n_paragraphs,
+                                  n_citations=n_paragraphs)
+
+    def time_remove_comments(self, n_paragraphs):
+        texutils.remove_comments(self.text)
+
+
+class InlineSuite(object):
+    """Inlining and loading projects as a function of include depth."""
+    params = [[0, 1, 2, 3]]
+    param_names = ['depth']
+    timeout = 300
+
+    def setup(self, depth):
+        self.base_dir = tempfile.mkdtemp()
+        self.root_path = make_project(self.base_dir, depth=depth, n_inputs=3)
+        with codecs.open(self.root_path, 'r', encoding='utf-8') as f:
+            self.root_text = f.read()
+        texpath.clear_cache()
+
+    def teardown(self, depth):
+        shutil.rmtree(self.base_dir)
+
+    def time_inline(self, depth):
+        texutils.inline(self.root_text, base_dir=self.base_dir)
+
+    def time_filesystem_document(self, depth):
+        FilesystemTexDocument(self.root_path)
+
+
+class FindRootSuite(object):
+    """Root document detection as a function of the number of documents."""
+    params = [[10, 100, 1000]]
+    param_names = ['n_files']
+
+    def setup(self, n_files):
+        self.base_dir = tempfile.mkdtemp()
+        body = make_body(n_sections=1, n_paragraphs=5)
+        for i in xrange(n_files):
+            path = os.path.join(self.base_dir, 's{0:d}.tex'.format(i))
+            with codecs.open(path, 'w', encoding='utf-8') as f:
+                f.write(body)
+        with codecs.open(os.path.join(self.base_dir, 'main.tex'), 'w',
+                         encoding='utf-8') as f:
+            f.write(make_document(n_sections=1, n_paragraphs=5))
+
+    def teardown(self, n_files):
+        shutil.rmtree(self.base_dir)
+
+    def time_find_root_tex_document(self, n_files):
+        texutils.find_root_tex_document(self.base_dir)
+
+
+class BatchInlineSuite(object):
+    """Serial and batch inlining of many projects as a function of the
+    number of worker processes.
+
+    With one process, batch inlining does less work than the serial
+    inliner (each name is resolved, and each text stripped, once), so it
+    should be no slower than ``time_serial``; e.g., for 48 of these
+    projects on one CPU, 0.118 s against 0.125 s. The batch tasks run
+    entirely in worker processes, so with more processes on as many cores
+    the time should fall close to ``time_serial / processes``.
+    """
+    params = [[1, 2, 4, 8]]
+    param_names = ['processes']
+    timeout = 600
+
+    def setup(self, processes):
+        self.base_dir = tempfile.mkdtemp()
+        self.root_paths = [
+            make_project(os.path.join(self.base_dir, 'p{0:d}'.format(i)),
+                         depth=2, n_inputs=3, seed=i)
+            for i in xrange(16)]
+        texpath.clear_cache()
+
+    def teardown(self, processes):
+        shutil.rmtree(self.base_dir)
+
+    def time_serial(self, processes):
+        for path in self.root_paths:
+            texutils.inline(texutils.read_text_file(path),
+                            base_dir=os.path.dirname(path))
+
+    def time_batch(self, processes):
+        inline_paths(self.root_paths, processes=processes)
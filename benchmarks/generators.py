@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Generators of synthetic LaTeX documents, projects and git repositories for
+benchmarking.
+
+All generators are deterministic for a given ``seed`` so that benchmark
+results are reproducible.
+"""
+
+import os
+import random
+import subprocess
+import codecs
+
+
+WORDS = (u'galaxy star stellar population disk halo bulge metallicity '
+         u'photometry spectroscopy survey redshift luminosity function '
+         u'cluster dust emission model fit colour magnitude distance '
+         u'the of and in a to is that with for by on are from this').split()
+
+
+def make_paragraph(rng, n_words=100, n_citations=0, n_keys=200):
+    """Make a paragraph of random words with citations scattered through it.
+
+    Parameters
+    ----------
+    rng : :class:`random.Random`
+        Random number generator.
+    n_words : int
+        Number of words in the paragraph.
+    n_citations : int
+        Number of ``\\cite`` commands in the paragraph.
+    n_keys : int
+        Number of distinct cite keys to choose from.
+
+    Returns
+    -------
+    text : unicode
+        The paragraph.
+    """
+    words = [rng.choice(WORDS) for i in xrange(n_words)]
+    for i in xrange(n_citations):
+        keys = u','.join(u'Key:{0:d}'.format(rng.randrange(n_keys))
+                         for j in xrange(rng.randint(1, 3)))
+        pos = rng.randrange(len(words) + 1)
+        words.insert(pos, u'\\citep{{{0}}}'.format(keys))
+    # Sprinkle in comments
+    text = u' '.join(words) + u'.'
+    return text + u' % a comment about this paragraph\n'
+
+
+def make_body(n_sections=10, n_paragraphs=5, n_citations=50, n_words=100,
+              seed=0):
+    """Make the body of a LaTeX document (sections of paragraphs).
+
+    Parameters
+    ----------
+    n_sections : int
+        Number of ``\\section`` commands.
+    n_paragraphs : int
+        Number of paragraphs per section.
+    n_citations : int
+        Total number of ``\\cite`` commands, spread evenly over paragraphs.
+    n_words : int
+        Number of words per paragraph.
+    seed : int
+        Seed of the random number generator.
+
+    Returns
+    -------
+    text : unicode
+        The document body.
+    """
+    rng = random.Random(seed)
+    n_total = max(n_sections * n_paragraphs, 1)
+    chunks = []
+    for i in xrange(n_sections):
+        chunks.append(u'\\section{{Section {0:d}}}\n'.format(i))
+        for j in xrange(n_paragraphs):
+            k = i * n_paragraphs + j
+            n_cite = (n_citations * (k + 1)) // n_total \
+                - (n_citations * k) // n_total
+            chunks.append(make_paragraph(rng, n_words=n_words,
+                                         n_citations=n_cite))
+            chunks.append(u'\n')
+    return u''.join(chunks)
+
+
+def make_document(n_sections=10, n_paragraphs=5, n_citations=50,
+                  n_words=100, seed=0):
+    """Make a complete LaTeX document.
+
+    See :func:`make_body` for parameters.
+
+    Returns
+    -------
+    text : unicode
+        The document.
+    """
+    body = make_body(n_sections=n_sections, n_paragraphs=n_paragraphs,
+                     n_citations=n_citations, n_words=n_words, seed=seed)
+    return u''.join((u'\\documentclass{article}\n',
+                     u'\\begin{document}\n',
+                     body,
+                     u'\\bibliography{refs}\n',
+                     u'\\end{document}\n'))
+
+
+def make_project(base_dir, depth=2, n_inputs=3, n_sections=2,
+                 n_paragraphs=3, n_citations=10, n_words=100, seed=0):
+    """Write a LaTeX project whose root document inputs a tree of documents.
+
+    Each document has ``n_inputs`` children, down to ``depth`` levels of
+    ``\\input`` commands below the root document. Input documents are
+    written to the ``sections/`` directory.
+
+    Parameters
+    ----------
+    base_dir : str
+        Directory to write the project into.
+    depth : int
+        Depth of the include tree.
+    n_inputs : int
+        Number of documents input by each document above the bottom of
+        the tree.
+    n_sections, n_paragraphs, n_citations, n_words : int
+        Content of each document (see :func:`make_body`).
+    seed : int
+        Seed of the random number generator.
+
+    Returns
+    -------
+    root_path : str
+        Path of the root document, ``main.tex``.
+    """
+    sections_dir = os.path.join(base_dir, 'sections')
+    if not os.path.exists(sections_dir):
+        os.makedirs(sections_dir)
+    counter = [0]
+
+    def _write(level):
+        """Write a body with its inputs, returning its input name."""
+        name = u'sections/s{0:d}'.format(counter[0])
+        counter[0] += 1
+        body = make_body(n_sections=n_sections, n_paragraphs=n_paragraphs,
+                         n_citations=n_citations, n_words=n_words,
+                         seed=seed + counter[0])
+        if level < depth:
+            inputs = [_write(level + 1) for i in xrange(n_inputs)]
+            body += u''.join(u'\\input{{{0}}}\n'.format(n) for n in inputs)
+        _write_text(os.path.join(base_dir, name + '.tex'), body)
+        return name
+
+    root_body = make_body(n_sections=n_sections, n_paragraphs=n_paragraphs,
+                          n_citations=n_citations, n_words=n_words, seed=seed)
+    if depth > 0:
+        inputs = [_write(1) for i in xrange(n_inputs)]
+        root_body += u''.join(u'\\input{{{0}}}\n'.format(n) for n in inputs)
+    root_path = os.path.join(base_dir, 'main.tex')
+    _write_text(root_path, u''.join((u'\\documentclass{article}\n',
+                                     u'\\begin{document}\n',
+                                     root_body,
+                                     u'\\bibliography{refs}\n',
+                                     u'\\end{document}\n')))
+    _write_text(os.path.join(base_dir, 'refs.bib'), make_bib(200, seed=seed))
+    return root_path
+
+
+def make_bib(n_entries, seed=0):
+    """Make a BibTeX database with keys ``Key:0`` to ``Key:<n_entries - 1>``.
+
+    Returns
+    -------
+    text : unicode
+        The BibTeX database.
+    """
+    rng = random.Random(seed)
+    entries = []
+    for i in xrange(n_entries):
+        title = u' '.join(rng.choice(WORDS) for j in xrange(8))
+        entries.append(
+            u'@article{{Key:{0:d},\n'
+            u'  author = {{{{Author}}, A. and {{Other}}, B.}},\n'
+            u'  title = {{{1}}},\n'
+            u'  year = {2:d}\n'
+            u'}}\n\n'.format(i, title, 1990 + i % 30))
+    return u''.join(entries)
+
+
+def make_git_repo(repo_dir, n_commits=100, **kwargs):
+    """Make a git repository with a long history of a LaTeX project.
+
+    The project is made by :func:`make_project`; each subsequent commit
+    rewrites one of the input documents.
+
+    Parameters
+    ----------
+    repo_dir : str
+        Directory of the new repository.
+    n_commits : int
+        Number of commits in the history.
+    kwargs : dict
+        Arguments passed to :func:`make_project`.
+
+    Returns
+    -------
+    shas : list
+        SHAs of the commits, oldest first.
+    """
+    root_path = make_project(repo_dir, **kwargs)
+    sections_dir = os.path.join(repo_dir, 'sections')
+    section_names = sorted(os.listdir(sections_dir))
+    _git(repo_dir, 'init', '-q')
+    _git(repo_dir, 'add', '.')
+    _git(repo_dir, 'commit', '-q', '-m', 'Initial commit')
+    shas = [_git(repo_dir, 'rev-parse', 'HEAD')]
+    rng = random.Random(kwargs.get('seed', 0))
+    for i in xrange(1, n_commits):
+        if len(section_names) > 0:
+            path = os.path.join(sections_dir, rng.choice(section_names))
+        else:
+            path = root_path
+        with codecs.open(path, 'a', encoding='utf-8') as f:
+            f.write(make_paragraph(rng, n_citations=1))
+        _git(repo_dir, 'commit', '-q', '-a', '-m', 'Commit {0:d}'.format(i))
+        shas.append(_git(repo_dir, 'rev-parse', 'HEAD'))
+    return shas
+
+
+def _git(repo_dir, *args):
+    env = dict(os.environ,
+               GIT_AUTHOR_NAME='paperweight',
+               GIT_AUTHOR_EMAIL='pw@example.com',
+               GIT_COMMITTER_NAME='paperweight',
+               GIT_COMMITTER_EMAIL='pw@example.com')
+    output = subprocess.check_output(('git',) + args, cwd=repo_dir, env=env)
+    return output.strip()
+
+
+def _write_text(path, text):
+    with codecs.open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Run the benchmark suites without asv and print scaling curves.
+
+The benchmarks are written for `asv <https://asv.readthedocs.io>`_, which
+records results across commits (``asv run``, ``asv publish``). For a quick
+look at how each benchmark scales with its parameters in the current
+environment, run::
+
+    python -m benchmarks.scaling [pattern]
+
+from the root of the repository, where the optional ``pattern`` selects
+benchmarks whose ``Suite.time_name`` contains it.
+"""
+
+import os
+import sys
+import shutil
+import inspect
+import tempfile
+import timeit
+import itertools
+
+from . import bench_document, bench_texutils, bench_gitio
+
+
+MODULES = (bench_document, bench_texutils, bench_gitio)
+
+
+def iter_suites(modules=MODULES):
+    """Iterate over benchmark suite classes."""
+    for module in modules:
+        for name, obj in sorted(vars(module).items()):
+            if inspect.isclass(obj) and obj.__module__ == module.__name__ \
+                    and any(n.startswith('time_') for n in dir(obj)):
+                yield obj
+
+
+def run_suite(suite_cls, pattern='', repeat=3):
+    """Time each benchmark of a suite for each combination of parameters.
+
+    Returns
+    -------
+    results : list
+        List of ``(benchmark name, params, seconds)`` tuples, where
+        ``seconds`` is the best time per call.
+    """
+    names = [n for n in sorted(dir(suite_cls)) if n.startswith('time_')
+             and pattern in '.'.join((suite_cls.__name__, n))]
+    if len(names) == 0:
+        return []
+    suite = suite_cls()
+    cache_args = ()
+    cache_dir = None
+    if hasattr(suite, 'setup_cache'):
+        cache_dir = tempfile.mkdtemp()
+        cwd = os.getcwd()
+        os.chdir(cache_dir)
+        try:
+            cache_args = (suite.setup_cache(),)
+        finally:
+            os.chdir(cwd)
+    results = []
+    try:
+        for params in itertools.product(*getattr(suite, 'params', [[]])):
+            args = cache_args + params
+            if hasattr(suite, 'setup'):
+                suite.setup(*args)
+            try:
+                for name in names:
+                    func = getattr(suite, name)
+                    timer = timeit.Timer(lambda: func(*args))
+                    number = _autorange(timer)
+                    best = min(timer.repeat(repeat=repeat, number=number))
+                    results.append(('.'.join((suite_cls.__name__, name)),
+                                    params, best / number))
+            finally:
+                if hasattr(suite, 'teardown'):
+                    suite.teardown(*args)
+    finally:
+        if cache_dir is not None:
+            shutil.rmtree(cache_dir)
+    return results
+
+
+def _autorange(timer, min_time=0.2):
+    """Number of loops so that a timing run lasts at least ``min_time``."""
+    number = 1
+    while True:
+        if timer.timeit(number=number) >= min_time or number >= 10 ** 6:
+            return number
+        number *= 10
+
+
+def print_results(suite_cls, results, stream=sys.stdout):
+    """Print a scaling curve (time per parameter value) for each
+    benchmark.
+    """
+    param_names = getattr(suite_cls, 'param_names', [])
+    for name, group in itertools.groupby(results, key=lambda r: r[0]):
+        stream.write('{0}\n'.format(name))
+        for _, params, seconds in group:
+            label = ', '.join('{0}={1}'.format(n, p)
+                              for n, p in zip(param_names, params))
+            stream.write('    {0:<30s} {1:12.6f} s\n'.format(label, seconds))
+
+
+def main():
+    pattern = sys.argv[1] if len(sys.argv) > 1 else ''
+    for suite_cls in iter_suites():
+        results = run_suite(suite_cls, pattern=pattern)
+        # group by benchmark, ordered by parameters
+        results.sort(key=lambda r: r[0])
+        print_results(suite_cls, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Utilities for reading LaTeX sources from archives without extracting them.
+
+Source bundles, such as arXiv ``.tar.gz`` source files, are read with
+:class:`TexArchive`. A tar archive is decompressed once, in a single
+streaming pass that indexes all members and keeps the data of LaTeX source
+members (``.tex``, ``.bbl``, ``.bib``, ...) in memory; other members, such
+as figures, are skipped over. Zip archives are indexed from their central
+directory and kept open, and members are read lazily, straight from their
+offsets. A gzipped single file (as arXiv serves single-file submissions)
+is treated as an archive of one ``.tex`` member.
+
+Use :class:`paperweight.document.ArchiveTexDocument` for the
+:class:`paperweight.document.TexDocument` interface to an archive.
+"""
+
+import gzip
+import os
+import posixpath
+import tarfile
+import threading
+import zipfile
+
+from .instrument import incr, timed
+from .sources import TexSource, _list_prefix
+from . import texutils
+
+
+__all__ = ['TexArchive', 'inline_archive']
+
+
+# Extensions of members whose data is read while indexing a tar archive
+SOURCE_EXTENSIONS = ('.tex', '.bbl', '.bib', '.sty', '.cls', '.bst')
+
+
+class TexArchive(TexSource):
+    """Index of the members of a tar, zip or gzip archive of LaTeX sources.
+
+    A :class:`TexArchive` is a :class:`paperweight.sources.TexSource` whose
+    paths are the (normalized) paths of members in the archive.
+
+    Parameters
+    ----------
+    path : str
+        Path to the archive file.
+
+    Attributes
+    ----------
+    path : str
+        Absolute path to the archive file.
+    """
+    def __init__(self, path):
+        super(TexArchive, self).__init__()
+        self.path = os.path.abspath(path)
+        # Data of members, keyed by normalized path. Data is None for
+        # members that have not been read.
+        self._members = {}
+        # Open zip file, and ZipInfo of its members keyed by normalized
+        # path, for reading members without scanning the archive
+        self._zip = None
+        self._zip_infos = {}
+        self._zip_lock = threading.Lock()
+        with timed('archive_index'):
+            if tarfile.is_tarfile(self.path):
+                self._kind = 'tar'
+                self._index_tar()
+            elif zipfile.is_zipfile(self.path):
+                self._kind = 'zip'
+                self._index_zip()
+            else:
+                self._kind = 'gzip'
+                self._index_gzip()
+        incr('archive_members', len(self._members))
+
+    def _index_tar(self):
+        # Stream mode ('r|*') reads the compressed file once, sequentially
+        tar = tarfile.open(self.path, mode='r|*')
+        try:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                name = _normpath(member.name)
+                if name.lower().endswith(SOURCE_EXTENSIONS):
+                    data = tar.extractfile(member).read()
+                    incr('archive_bytes_read', len(data))
+                    self._members[name] = data
+                else:
+                    self._members[name] = None
+        finally:
+            tar.close()
+
+    def _index_zip(self):
+        self._zip = zipfile.ZipFile(self.path)
+        for info in self._zip.infolist():
+            if not info.filename.endswith('/'):
+                name = _normpath(info.filename)
+                self._members[name] = None
+                self._zip_infos[name] = info
+
+    def _index_gzip(self):
+        name = os.path.basename(self.path)
+        if name.endswith('.gz'):
+            name = name[:-3]
+        if not name.endswith('.tex'):
+            name = '.'.join((name, 'tex'))
+        f = gzip.open(self.path, 'rb')
+        try:
+            data = f.read()
+        finally:
+            f.close()
+        incr('archive_bytes_read', len(data))
+        self._members[name] = data
+
+    def paths(self):
+        """List of the paths of all files in the archive."""
+        return self._members.keys()
+
+    def exists(self, path):
+        """`True` if a file exists at ``path`` in the archive."""
+        return _normpath(path) in self._members
+
+    def read_bytes(self, path):
+        """Read the data of the file at ``path`` in the archive, or `None`
+        if it does not exist.
+        """
+        name = _normpath(path)
+        if name not in self._members:
+            return None
+        data = self._members[name]
+        if data is None:
+            data = self._read_member(name)
+        return data
+
+    def list(self, base_dir=''):
+        """List of the paths of all files within the directory ``base_dir``
+        of the archive.
+        """
+        return _list_prefix(self._members.keys(), base_dir)
+
+    def _read_member(self, name):
+        """Read a member that was not read while indexing the archive."""
+        with timed('archive_read'):
+            if self._kind == 'zip':
+                # The ZipInfo locates the member in the open file
+                with self._zip_lock:
+                    data = self._zip.read(self._zip_infos[name])
+            else:
+                tar = tarfile.open(self.path, mode='r:*')
+                try:
+                    for member in tar:
+                        if member.isfile() and _normpath(member.name) == name:
+                            data = tar.extractfile(member).read()
+                            break
+                finally:
+                    tar.close()
+        incr('archive_bytes_read', len(data))
+        return data
+
+    def close(self):
+        """Close the archive file (if it is kept open to read members
+        lazily). Members that were not read while indexing can no longer
+        be read.
+        """
+        if self._zip is not None:
+            self._zip.close()
+
+    def find_root(self):
+        """Find the tex document in the archive that can be considered
+        a root, by searching contents for ``'\\documentclass'`` (see
+        :func:`paperweight.texutils.find_root_tex_document`).
+
+        Returns
+        -------
+        path : str
+            Path of the root tex document in the archive.
+        """
+        return texutils.find_root_in_source(self)
+
+
+def inline_archive(archive, root_text, base_dir=''):
+    """Inline all input latex files that exist in an archive.
+
+    The inlining is accomplished recursively. All files are read as UTF-8
+    unicode files.
+
+    Parameters
+    ----------
+    archive : :class:`TexArchive`
+        The archive.
+    root_text : unicode
+        Text of tex document where referenced files will be inlined.
+    base_dir : str
+        Directory of the root tex document in the archive.
+
+    Returns
+    -------
+    txt : unicode
+        Text with referenced files included.
+    """
+    return texutils.inline_source(archive, root_text, base_dir=base_dir)
+
+
+def _normpath(path):
+    """Normalize a member path (e.g., ``'./sec/intro.tex'``)."""
+    return posixpath.normpath(path.replace(os.sep, '/'))
@@ -0,0 +1,288 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Parallel inlining of many LaTeX documents.
+
+:func:`inline_batch` inlines the input documents of many root documents (see
+:func:`paperweight.texutils.inline_source`). Each document is inlined by one
+task, in a worker process, with the same sequence of substitutions as the
+serial inliner, so the output is identical to
+:func:`paperweight.texutils.inline_source`. A task does less work than the
+serial inliner:
+
+- each input name is resolved once per document,
+- each file is read once per document, and an input document that is
+  input several times is inlined once,
+- comments are stripped from a given text once per worker, so files shared
+  by the documents that a worker inlines are stripped once.
+
+Stripping comments and substituting ``\\input`` commands is pure-Python
+regular expression work, so tasks run in worker processes rather than
+threads, and the calling process only dispatches them.
+
+Sources that cannot be pickled to worker processes (such as
+:class:`paperweight.gitio.GitTree`) are read in the calling process: the
+files of each document's include graph are sent to its task. A document
+whose inlining needs a file that is not in this graph (which can only
+happen if an ``\\input`` command is formed by inlining another file) is
+inlined serially instead.
+"""
+
+import os
+import logging
+import cPickle as pickle
+from multiprocessing import Pool, cpu_count
+
+from .sources import TexSource, FilesystemSource
+from .instrument import incr, timed
+from . import texutils, bytescan
+
+
+__all__ = ['inline_batch', 'inline_paths']
+
+
+# Stripped texts, keyed by text, of the batch run by this process
+_stripped = {}
+
+
+def inline_paths(paths, processes=None):
+    """Inline the input documents of many root documents in the
+    filesystem (see :func:`inline_batch`).
+
+    Parameters
+    ----------
+    paths : list
+        Paths of the root documents. Input documents are resolved relative
+        to the directory of each root document.
+    processes : int
+        Number of worker processes. Defaults to the number of CPUs.
+
+    Returns
+    -------
+    texts : list
+        Inlined text of each document, as returned by
+        :func:`paperweight.texutils.inline`.
+    """
+    source = FilesystemSource()
+    return inline_batch([(source, os.path.abspath(path)) for path in paths],
+                        processes=processes)
+
+
+def inline_batch(jobs, processes=None):
+    """Inline the input documents of many root documents in parallel.
+
+    Parameters
+    ----------
+    jobs : list
+        ``(source, path)`` or ``(source, path, base_dir)`` tuples of the
+        :class:`paperweight.sources.TexSource` and path of each root
+        document, and the directory that its input documents are resolved
+        against (by default, the directory of the root document).
+    processes : int
+        Number of worker processes. Defaults to the number of CPUs. With
+        ``processes=1`` all work is done in the calling process.
+
+    Returns
+    -------
+    texts : list
+        Inlined text of each document, identical to
+        ``inline_source(source, source.read(path), base_dir=base_dir)``,
+        or `None` for documents that do not exist.
+    """
+    if processes is None:
+        processes = cpu_count()
+    tasks = []
+    picklable = {}
+    for job in jobs:
+        source, path = job[:2]
+        base_dir = job[2] if len(job) > 2 else None
+        if base_dir is None:
+            base_dir = source.dirname(path)
+        if processes > 1 and not _is_picklable(source, picklable):
+            # Send the files of the include graph to the worker
+            with timed('batch_resolve'):
+                source = _GraphSource(source, path, base_dir)
+        tasks.append((source, path, base_dir))
+    incr('batch_documents', len(tasks))
+
+    with timed('batch_inline'):
+        if processes > 1:
+            pool = Pool(processes, initializer=_clear_stripped)
+            try:
+                chunksize = max(1, len(tasks) // (4 * processes))
+                results = pool.map(_inline_task, tasks, chunksize)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            try:
+                results = map(_inline_task, tasks)
+            finally:
+                _clear_stripped()
+
+    outputs = []
+    for job, task, (complete, result) in zip(jobs, tasks, results):
+        if not complete:
+            # The include graph was incomplete: inline serially
+            incr('batch_serial_fallbacks')
+            source, path, base_dir = job[0], task[1], task[2]
+            result = texutils.inline_source(source, source.read(path),
+                                            base_dir=base_dir)
+        outputs.append(result)
+    return outputs
+
+
+def _is_picklable(source, picklable):
+    """`True` if a source can be sent to worker processes (memoized by
+    source in ``picklable``).
+    """
+    key = id(source)
+    if key not in picklable:
+        try:
+            pickle.dumps(source, pickle.HIGHEST_PROTOCOL)
+            picklable[key] = True
+        except (pickle.PicklingError, TypeError, AttributeError):
+            picklable[key] = False
+    return picklable[key]
+
+
+def _clear_stripped():
+    _stripped.clear()
+
+
+def _inline_task(task):
+    """Inline a document from its ``(source, path, base_dir)``.
+
+    Returns
+    -------
+    complete : bool
+        `False` if the source is the include graph of the document, and a
+        file that is not in it is needed.
+    text : unicode
+        The inlined text, or `None` if the document does not exist or the
+        graph is incomplete.
+    """
+    source, path, base_dir = task
+    text = source.read(path)
+    if text is None:
+        return True, None
+    try:
+        return True, _Inliner(source, base_dir).inline(text)
+    except _Unresolved:
+        return False, None
+
+
+class _Unresolved(Exception):
+    """An input document's name is not in the include graph."""
+    pass
+
+
+class _GraphSource(TexSource):
+    """The files of a document's include graph, read from another source,
+    and the resolution of each name input by them.
+
+    Names are found by scanning the raw data of the files, with commented
+    commands included, so the graph holds every file the inliner can need
+    unless an input command is formed by inlining another file.
+    """
+    def __init__(self, source, path, base_dir):
+        super(_GraphSource, self).__init__()
+        self._files = {}
+        self._resolved = {}
+        pending = [path]
+        while len(pending) > 0:
+            path = pending.pop()
+            data = source.read_bytes(path)
+            self._files[path] = data
+            if data is None:
+                continue
+            for name in bytescan.iter_input_names(data):
+                if name in self._resolved:
+                    continue
+                child_path = source.find(name, base_dir)
+                self._resolved[name] = child_path
+                if child_path is not None and child_path not in self._files:
+                    pending.append(child_path)
+
+    def read_bytes(self, path):
+        return self._files.get(path)
+
+    def exists(self, path):
+        return self._files.get(path) is not None
+
+    def list(self, base_dir=''):
+        return []
+
+    def find(self, name, base_dir=''):
+        try:
+            return self._resolved[name]
+        except KeyError:
+            raise _Unresolved(name)
+
+
+class _Inliner(object):
+    """Inlines documents of a source like
+    :func:`paperweight.texutils.inline_source`, resolving each name,
+    reading each file and inlining each input document once.
+    """
+    def __init__(self, source, base_dir):
+        super(_Inliner, self).__init__()
+        self.source = source
+        self.base_dir = base_dir
+        self._paths = {}
+        self._texts = {}
+        self._outputs = {}
+
+    def inline(self, text):
+        """Inline a text, with the substitutions of
+        :func:`paperweight.texutils.inline_source`.
+        """
+        result = _strip(text)
+        result = texutils.input_pattern.sub(self._sub_line, result)
+        result = texutils.include_pattern.sub(self._sub_line, result)
+        result = texutils.input_ifexists_pattern.sub(self._sub_line_ifexists,
+                                                     result)
+        return result
+
+    def _find(self, match):
+        fname = match.group(1)
+        if not fname.endswith('.tex'):
+            fname = ".".join((fname, 'tex'))
+        if fname not in self._paths:
+            self._paths[fname] = self.source.find(fname, self.base_dir)
+        return fname, self._paths[fname]
+
+    def _read(self, path):
+        if path not in self._texts:
+            self._texts[path] = self.source.read(path)
+        return self._texts[path]
+
+    def _sub_line(self, match):
+        fname, path = self._find(match)
+        if path is None:
+            log = logging.getLogger(__name__)
+            log.warning("Cannot find {0} for in-lining".format(fname))
+            return u""
+        # The output of an input document is the same wherever it is input
+        if path not in self._outputs:
+            self._outputs[path] = self.inline(self._read(path))
+        return self._outputs[path]
+
+    def _sub_line_ifexists(self, match):
+        fname, path = self._find(match)
+        if path is not None:
+            included_text = "\n".join((self._read(path), match.group(2)))
+        else:
+            included_text = match.group(3)
+        return self.inline(included_text)
+
+
+def _strip(text):
+    """Text without comments, stripped once per process."""
+    try:
+        stripped = _stripped[text]
+        incr('batch_strip_hits')
+    except KeyError:
+        stripped = texutils.remove_comments(text)
+        _stripped[text] = stripped
+    return stripped
@@ -0,0 +1,388 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Utilities for reading BibTeX bibliography databases.
+
+Large shared bibliographies are not parsed as a whole. Instead,
+:func:`index_bib_file` streams through a ``.bib`` file once to build an
+index of the byte offset and length of each entry, keyed by cite key.
+The index is cached alongside the ``.bib`` file and reused for as long as
+the ``.bib`` file's modification time and size are unchanged.
+:class:`BibDatabase` then loads individual entries lazily by seeking
+to them.
+"""
+
+import io
+import os
+import re
+import json
+import codecs
+import logging
+from collections import OrderedDict
+
+from .instrument import incr, timed
+
+
+__all__ = ['BibDatabase', 'index_bib_file', 'index_bib_stream']
+
+
+INDEX_SUFFIX = '.pwidx'
+INDEX_VERSION = 2
+
+# Start of an entry, e.g. ``@article{`` or ``@article(``, including @string,
+# @preamble and @comment.
+entry_start_pattern = re.compile(br'\s*@\s*(\w+)\s*([{(])')
+# Characters that delimit entries and field values
+delimiter_pattern = re.compile(br'[{}()"]')
+# Characters other than braces, deleted to count the braces of a line
+_non_braces = b''.join(chr(i) for i in xrange(256) if chr(i) not in b'{}')
+# Entry types that do not have cite keys.
+NONKEY_TYPES = ('string', 'preamble', 'comment')
+
+
+class BibDatabase(object):
+    """A BibTeX database whose entries are loaded lazily from an index.
+
+    Parameters
+    ----------
+    path : str
+        Path to the ``.bib`` file.
+    use_cache : bool
+        If `True` (default), the index is read from (and written to) a
+        cache file alongside the ``.bib`` file.
+
+    Attributes
+    ----------
+    path : str
+        Absolute path to the ``.bib`` file, or `None` if the database is
+        held in memory (see :meth:`from_bytes`).
+    index : OrderedDict
+        Dictionary of ``(offset, length)`` byte spans of each entry in the
+        ``.bib`` file, keyed by cite key.
+    """
+    def __init__(self, path, use_cache=True):
+        super(BibDatabase, self).__init__()
+        self.path = os.path.abspath(path)
+        self.index = index_bib_file(self.path, use_cache=use_cache)
+        self._data = None
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Make a database from the bytes of a BibTeX file held in memory,
+        such as a git blob.
+
+        Parameters
+        ----------
+        data : str
+            Bytes of the BibTeX file.
+
+        Returns
+        -------
+        bib_database : :class:`BibDatabase`
+            The database, with ``path`` set to `None`.
+        """
+        db = cls.__new__(cls)
+        db.path = None
+        db._data = data
+        db.index = index_bib_stream(io.BytesIO(data))
+        return db
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def keys(self):
+        """List of cite keys in the database."""
+        return self.index.keys()
+
+    def _open(self):
+        if self._data is not None:
+            return io.BytesIO(self._data)
+        return open(self.path, 'rb')
+
+    def read_entry(self, key):
+        """Read the BibTeX source of an entry.
+
+        Parameters
+        ----------
+        key : str
+            Cite key of the entry.
+
+        Returns
+        -------
+        text : unicode
+            The BibTeX source of the entry, from its ``@`` to its closing
+            brace.
+        """
+        offset, length = self.index[key]
+        with self._open() as f:
+            f.seek(offset)
+            data = f.read(length)
+        return data.decode('utf-8')
+
+    def iter_entries(self, keys):
+        """Iterate over the BibTeX source of several entries.
+
+        Entries are read in file order so that the file is read forwards
+        with a single open file handle.
+
+        Parameters
+        ----------
+        keys : iterable
+            Cite keys of the entries. Keys not in the database are skipped.
+
+        Yields
+        ------
+        key : str
+            Cite key.
+        text : unicode
+            The BibTeX source of the entry.
+        """
+        spans = sorted((self.index[k], k) for k in set(keys)
+                       if k in self.index)
+        with self._open() as f:
+            for (offset, length), key in spans:
+                f.seek(offset)
+                yield key, f.read(length).decode('utf-8')
+
+    def missing_keys(self, keys):
+        """Cite keys that are not in the database.
+
+        Parameters
+        ----------
+        keys : iterable
+            Cite keys, such as
+            :attr:`paperweight.document.TexDocument.bib_keys`.
+
+        Returns
+        -------
+        missing : list
+            Sorted list of cite keys not found in the database.
+        """
+        return sorted(set(k for k in keys if k not in self.index))
+
+    def unused_keys(self, keys):
+        """Cite keys in the database that are not among ``keys``.
+
+        Parameters
+        ----------
+        keys : iterable
+            Cite keys, such as
+            :attr:`paperweight.document.TexDocument.bib_keys`.
+
+        Returns
+        -------
+        unused : list
+            Cite keys of the database that are not cited, in file order.
+        """
+        keys = set(keys)
+        return [k for k in self.index if k not in keys]
+
+
+def index_bib_file(path, use_cache=True):
+    """Build an index of the entries in a ``.bib`` file.
+
+    Parameters
+    ----------
+    path : str
+        Path to the ``.bib`` file.
+    use_cache : bool
+        If `True` (default), reuse the index cached alongside the ``.bib``
+        file (``path + '.pwidx'``) if it is up-to-date, and otherwise write
+        the new index to that cache.
+
+    Returns
+    -------
+    index : OrderedDict
+        Dictionary of ``(offset, length)`` byte spans of each entry in the
+        ``.bib`` file, keyed by cite key.
+    """
+    log = logging.getLogger(__name__)
+    st = os.stat(path)
+    cache_path = path + INDEX_SUFFIX
+    if use_cache:
+        index = _read_index_cache(cache_path, st)
+        if index is not None:
+            incr('bib_index_cache_hits')
+            return index
+        incr('bib_index_cache_misses')
+
+    with timed('bib_index'):
+        with open(path, 'rb') as f:
+            index = index_bib_stream(f)
+
+    if use_cache:
+        try:
+            _write_index_cache(cache_path, st, index)
+        except (IOError, OSError):
+            log.debug("Cannot write bib index cache {0}".format(cache_path))
+    return index
+
+
+def index_bib_stream(f):
+    """Build an index of the entries in a BibTeX byte stream.
+
+    The stream is read once, line by line, tracking brace depth so that
+    an entry is known to end when its closing brace (or parenthesis) is
+    reached. As in BibTeX, entries may be delimited by braces or
+    parentheses, the cite key may be on a line after the ``@type{``, and
+    backslashes do not escape braces. A line that starts with ``@`` and an
+    entry type always starts a new entry; if the previous entry's braces
+    are unbalanced, a warning is logged and that entry ends at the start
+    of the line.
+
+    Parameters
+    ----------
+    f : file
+        File-like object, opened in binary mode, positioned at the start
+        of the BibTeX database.
+
+    Returns
+    -------
+    index : OrderedDict
+        Dictionary of ``(offset, length)`` byte spans of each entry in the
+        stream, keyed by cite key.
+    """
+    log = logging.getLogger(__name__)
+    index = OrderedDict()
+    offset = 0
+    entry = None
+    for line in iter(f.readline, b''):
+        pos = 0
+        if b'@' in line:
+            match = entry_start_pattern.match(line)
+            if match is not None:
+                if entry is not None:
+                    log.warning("Unbalanced braces in BibTeX entry at byte "
+                                "{0:d}".format(entry.offset))
+                    entry.end(index, offset)
+                entry = _EntryScanner(offset + line.index(b'@'),
+                                      match.group(1), match.group(2))
+                pos = match.end()
+        if entry is not None:
+            end = entry.scan(line, pos)
+            if end is not None:
+                entry.end(index, offset + end)
+                entry = None
+        offset += len(line)
+    if entry is not None:
+        log.warning("Unterminated BibTeX entry at byte "
+                    "{0:d}".format(entry.offset))
+        entry.end(index, offset)
+    return index
+
+
+class _EntryScanner(object):
+    """State of the scan of a BibTeX entry (see :func:`index_bib_stream`).
+
+    Parameters
+    ----------
+    offset : int
+        Byte offset of the entry's ``@``.
+    entry_type : str
+        Type of the entry (e.g., ``'article'``).
+    opener : str
+        ``'{'`` or ``'('``, the delimiter of the entry.
+    """
+    def __init__(self, offset, entry_type, opener):
+        super(_EntryScanner, self).__init__()
+        self.offset = offset
+        self.closer = b'}' if opener == b'{' else b')'
+        self.depth = 0
+        self.in_quote = False
+        # Bytes of the cite key read so far, or None once it is read (or
+        # if the entry has no key)
+        if entry_type.lower() in NONKEY_TYPES:
+            self._key_bytes = None
+        else:
+            self._key_bytes = b''
+        self.key = None
+
+    def scan(self, line, pos):
+        """Scan a line from ``pos``, returning the position just after the
+        entry's closing delimiter, or `None` if the entry does not end on
+        this line.
+        """
+        if self._key_bytes is not None:
+            # The key runs up to the first comma (or the closing delimiter
+            # of an entry without fields)
+            ends = [i for i in (line.find(b',', pos),
+                                line.find(self.closer, pos)) if i >= 0]
+            if len(ends) == 0:
+                self._key_bytes += line[pos:]
+                return None
+            end = min(ends)
+            key = (self._key_bytes + line[pos:end]).strip()
+            self._key_bytes = None
+            if len(key) > 0:
+                self.key = key.decode('utf-8')
+            if line[end] == self.closer:
+                return end + 1
+            pos = end + 1
+        if self.closer == b'}':
+            # Quotes do not matter in brace-delimited entries, so the
+            # entry only ends on this line if, with matched pairs of
+            # braces removed, more braces are closed than are open.
+            braces = line[pos:].translate(None, _non_braces)
+            while b'{}' in braces:
+                braces = braces.replace(b'{}', b'')
+            n_closed = len(braces) - len(braces.lstrip(b'}'))
+            if n_closed <= self.depth:
+                self.depth += len(braces) - 2 * n_closed
+                return None
+        for match in delimiter_pattern.finditer(line, pos):
+            c = match.group()
+            if c == b'{':
+                self.depth += 1
+            elif c == b'}':
+                if self.depth == 0:
+                    if self.closer == b'}':
+                        return match.end()
+                else:
+                    self.depth -= 1
+            elif self.depth == 0:
+                if c == b'"':
+                    self.in_quote = not self.in_quote
+                elif c == self.closer and not self.in_quote:
+                    return match.end()
+        return None
+
+    def end(self, index, end):
+        """Add the entry, ending at byte ``end``, to the index if it has a
+        key.
+        """
+        if self.key is not None:
+            index[self.key] = (self.offset, end - self.offset)
+
+
+def _read_index_cache(cache_path, st):
+    """Read a cached index if it matches the ``os.stat`` result of the
+    ``.bib`` file, returning `None` otherwise.
+    """
+    try:
+        with codecs.open(cache_path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+    if cache.get('version') != INDEX_VERSION \
+            or cache.get('mtime') != st.st_mtime \
+            or cache.get('size') != st.st_size:
+        return None
+    return OrderedDict((k, (offset, length))
+                       for k, offset, length in cache['index'])
+
+
+def _write_index_cache(cache_path, st, index):
+    """Write an index to the cache file."""
+    cache = {'version': INDEX_VERSION,
+             'mtime': st.st_mtime,
+             'size': st.st_size,
+             'index': [(k, offset, length)
+                       for k, (offset, length) in index.iteritems()]}
+    with codecs.open(cache_path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f)
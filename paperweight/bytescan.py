@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Bytes-level scanning of LaTeX sources for extraction-only tasks.
+
+Finding cite keys, input documents, the bibliography name or the root
+document of a project does not need the full text of each file as unicode.
+The functions in this module scan raw UTF-8 data (a ``str``, or a
+memory-mapped file from :func:`map_file`) with bytes versions of the
+regular expressions in :mod:`paperweight.texutils`, and decode only the
+matched spans. Since UTF-8 encodes ASCII characters as themselves and never
+uses ASCII bytes within multi-byte characters, bytes patterns match the same
+spans as their unicode counterparts.
+
+Sources (see :mod:`paperweight.sources`) provide raw data with
+:meth:`paperweight.sources.TexSource.read_buffer`: files in the filesystem
+are memory-mapped and git blobs are read without decoding.
+"""
+
+import os
+import mmap
+import re
+
+from .instrument import incr, timed
+
+
+__all__ = ['map_file', 'iter_cite_keys', 'iter_input_names',
+           'find_bib_name', 'has_documentclass', 'iter_source_cite_keys']
+
+
+# Bytes versions of the patterns in paperweight.texutils
+cite_pattern = re.compile(br'\\cite((.*?)((\[.*?\])*)){(.*?)}')
+bib_pattern = re.compile(br'\\bibliography{(.*?)}')
+input_pattern = re.compile(br'\\input{(.*?)}')
+include_pattern = re.compile(br'\\include{(.*?)}')
+input_ifexists_pattern = re.compile(
+    br'\\InputIfFileExists{(.*)}{(.*)}{(.*)}')
+docclass_pattern = re.compile(br'\\documentclass(.*?){(.*?)}')
+
+
+def map_file(path):
+    """Memory-map a file for reading.
+
+    The map is unmapped when it is garbage collected, or with its
+    ``close()`` method.
+
+    Parameters
+    ----------
+    path : str
+        Path to the file.
+
+    Returns
+    -------
+    data : :class:`mmap.mmap`
+        Read-only map of the file (or an empty string for an empty file),
+        or `None` if the file cannot be read.
+    """
+    try:
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return b''
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (IOError, OSError):
+        return None
+    incr('files_mapped')
+    incr('bytes_mapped', size)
+    return data
+
+
+def iter_cite_keys(data):
+    """Iterate over the cite keys of the ``\\cite`` commands in UTF-8
+    encoded latex data.
+
+    Yields
+    ------
+    key : unicode
+        BibTeX cite key.
+    """
+    with timed('scan'):
+        spans = [match.group(5) for match in cite_pattern.finditer(data)]
+    for span in spans:
+        for key in span.decode('utf-8').replace(u" ", u"").split(u','):
+            yield key
+
+
+def iter_input_names(data):
+    """Iterate over the names of files input by UTF-8 encoded latex data
+    (see :func:`paperweight.texutils.iter_input_names`).
+
+    Yields
+    ------
+    name : unicode
+        File name as written in the document, with a ``.tex`` extension
+        added if it has none.
+    """
+    for pattern in (input_pattern, include_pattern, input_ifexists_pattern):
+        with timed('scan'):
+            spans = [match.group(1) for match in pattern.finditer(data)]
+        for span in spans:
+            fname = span.decode('utf-8')
+            if not fname.endswith('.tex'):
+                fname = ".".join((fname, 'tex'))
+            yield fname
+
+
+def find_bib_name(data):
+    """Name of the BibTeX bibliography of UTF-8 encoded latex data (see
+    :attr:`paperweight.document.TexDocument.bib_name`), or `None`.
+    """
+    bib_name = None
+    with timed('scan'):
+        for match in bib_pattern.finditer(data):
+            bib_name = match.group(1)
+    if bib_name is None:
+        return None
+    bib_name = bib_name.decode('utf-8')
+    if not bib_name.endswith('.bib'):
+        bib_name = ".".join((bib_name, "bib"))
+    return bib_name
+
+
+def has_documentclass(data):
+    """`True` if UTF-8 encoded latex data has a ``\\documentclass``
+    command, and so can be considered a root document.
+    """
+    with timed('scan'):
+        return docclass_pattern.search(data) is not None
+
+
+def iter_source_cite_keys(source, path, base_dir=None):
+    """Iterate over the cite keys of a document and its input documents,
+    without decoding the documents.
+
+    Keys are yielded in the order they are cited, walking a document and
+    then each of its input documents (``\\input``, ``\\include`` or
+    ``\\InputIfFileExists``) in turn. Each input document is scanned
+    once.
+
+    Parameters
+    ----------
+    source : :class:`paperweight.sources.TexSource`
+        Storage of the document.
+    path : str
+        Path to the root document in the source.
+    base_dir : str
+        Directory that input documents are resolved against. Defaults to
+        the directory of the document at ``path``.
+
+    Yields
+    ------
+    key : unicode
+        BibTeX cite key.
+    """
+    if base_dir is None:
+        base_dir = source.dirname(path)
+    seen = set()
+
+    def _iter_keys(path):
+        seen.add(path)
+        data = source.read_buffer(path)
+        if data is None:
+            return
+        for key in iter_cite_keys(data):
+            yield key
+        for name in iter_input_names(data):
+            child_path = source.find(name, base_dir)
+            if child_path is not None and child_path not in seen:
+                for key in _iter_keys(child_path):
+                    yield key
+
+    return _iter_keys(path)
@@ -0,0 +1,279 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Token-level concordance index of a document's text.
+
+A :class:`Concordance` tokenizes a text once, with
+:func:`paperweight.nlputils.wordify_spans`, and keeps the token array, the
+character offsets of every token, and postings lists from each term to the
+positions where it occurs. From this index, the context around any
+character offset (e.g., a ``\\cite`` or ``\\ref`` command), keyword in
+context (KWIC) listings of terms and phrases, and n-gram frequencies are
+answered without re-tokenizing the text.
+
+Positions are cumulative word counts, as in
+:meth:`paperweight.document.TexDocument.iter_citations`. The index is
+built lazily, on the first query.
+
+Example::
+
+    >>> doc = FilesystemTexDocument('paper.tex')
+    >>> for line in doc.concordance.kwic(u'galaxies', n_words=5):
+    ...     print u' '.join(line.before), '|', line.keyword, '|', \\
+    ...         u' '.join(line.after)
+"""
+
+import re
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict, namedtuple
+
+from .instrument import timed
+from . import nlputils
+
+
+__all__ = ['Concordance', 'KwicLine']
+
+
+# Characters of word tokens (as split by nltk.WordPunctTokenizer)
+_word_char = re.compile(ur'\w', re.UNICODE)
+_space_char = re.compile(ur'\s', re.UNICODE)
+
+
+KwicLine = namedtuple('KwicLine', ['position', 'before', 'keyword',
+                                   'after'])
+
+
+class Concordance(object):
+    """Token index of a text.
+
+    Parameters
+    ----------
+    text : unicode
+        Text to index.
+
+    Attributes
+    ----------
+    text : unicode
+        The indexed text.
+    """
+    def __init__(self, text):
+        super(Concordance, self).__init__()
+        self.text = text
+        self._tokens = None
+        self._starts = None
+        self._ends = None
+        self._postings = None
+        self._ngrams = {}
+
+    def _tokenize(self):
+        if self._tokens is None:
+            with timed('concordance'):
+                spans = nlputils.wordify_spans(self.text)
+                self._starts = [start for start, _ in spans]
+                self._ends = [end for _, end in spans]
+                self._tokens = [self.text[start:end]
+                                for start, end in spans]
+
+    def _index_postings(self):
+        if self._postings is None:
+            self._tokenize()
+            with timed('concordance'):
+                postings = defaultdict(list)
+                for i, token in enumerate(self._tokens):
+                    postings[token].append(i)
+                self._postings = dict(postings)
+
+    def __len__(self):
+        return len(self.tokens)
+
+    @property
+    def tokens(self):
+        """List of the words of the text (as given by
+        :func:`paperweight.nlputils.wordify`).
+        """
+        self._tokenize()
+        return self._tokens
+
+    @property
+    def spans(self):
+        """List of ``(start, end)`` character offsets of each token."""
+        self._tokenize()
+        return zip(self._starts, self._ends)
+
+    @property
+    def terms(self):
+        """Set of the distinct terms in the text."""
+        self._index_postings()
+        return set(self._postings)
+
+    def position_at(self, offset):
+        """Cumulative word count at a character offset: the number of
+        words in ``text[:offset]``.
+        """
+        self._tokenize()
+        start, _ = self._token_at(offset)
+        return (bisect_right(self._ends, start)
+                + len(self._fragment(start, offset)))
+
+    def words_before(self, offset, n_words=20):
+        """List of the last ``n_words`` words of ``text[:offset]``."""
+        self._tokenize()
+        start, _ = self._token_at(offset)
+        i = bisect_right(self._ends, start)
+        words = self._tokens[max(0, i - n_words):i] \
+            + self._fragment(start, offset)
+        return words[-n_words:] if n_words > 0 else []
+
+    def words_after(self, offset, n_words=20):
+        """List of the first ``n_words`` words of ``text[offset:]``."""
+        self._tokenize()
+        _, end = self._token_at(offset)
+        i = bisect_left(self._starts, end)
+        words = self._fragment(offset, end) + self._tokens[i:i + n_words]
+        return words[:n_words]
+
+    def _token_at(self, offset):
+        """Extent of the token that straddles ``offset``, or
+        ``(offset, offset)`` if ``offset`` is at a token boundary.
+
+        Words on either side of a straddled token are re-tokenized (see
+        :meth:`_fragment`), so that contexts are the words of the text
+        before and after ``offset``, as if it were cut there.
+        """
+        text = self.text
+        if offset <= 0 or offset >= len(text):
+            return offset, offset
+        kind = _char_kind(text[offset])
+        if kind == 0 or _char_kind(text[offset - 1]) != kind:
+            return offset, offset
+        start = offset - 1
+        while start > 0 and _char_kind(text[start - 1]) == kind:
+            start -= 1
+        end = offset + 1
+        while end < len(text) and _char_kind(text[end]) == kind:
+            end += 1
+        return start, end
+
+    def _fragment(self, start, end):
+        """Words of the piece ``text[start:end]`` of a straddled token."""
+        if start == end:
+            return []
+        return nlputils.wordify(self.text[start:end])
+
+    def positions(self, term):
+        """Sorted list of the positions of a term (or phrase) in the text.
+
+        Parameters
+        ----------
+        term : unicode or sequence
+            A single token, or a phrase given as a sequence of tokens or
+            as a text that is tokenized with
+            :func:`paperweight.nlputils.wordify`.
+
+        Returns
+        -------
+        positions : list
+            Positions (token indices) where the term, or the first token of
+            the phrase, occurs.
+        """
+        words = self._phrase(term)
+        if len(words) == 0:
+            return []
+        self._index_postings()
+        first = self._postings.get(words[0], [])
+        if len(words) == 1:
+            return list(first)
+        n = len(words)
+        tokens = self._tokens
+        return [i for i in first if tokens[i:i + n] == words]
+
+    def offsets(self, term):
+        """List of the ``(start, end)`` character offsets of each
+        occurrence of a term or phrase (see :meth:`positions`).
+        """
+        n = len(self._phrase(term))
+        return [(self._starts[i], self._ends[i + n - 1])
+                for i in self.positions(term)]
+
+    def count(self, term):
+        """Number of occurrences of a term or phrase (see
+        :meth:`positions`).
+        """
+        return len(self.positions(term))
+
+    def context(self, position, n_words=20, length=1):
+        """Tokens around the ``length`` tokens at ``position``.
+
+        Returns
+        -------
+        before : list
+            Up to ``n_words`` tokens before ``position``.
+        after : list
+            Up to ``n_words`` tokens after ``position + length``.
+        """
+        self._tokenize()
+        end = position + length
+        return (self._tokens[max(0, position - n_words):position],
+                self._tokens[end:end + n_words])
+
+    def kwic(self, term, n_words=5):
+        """Keyword in context listing of a term or phrase.
+
+        Parameters
+        ----------
+        term : unicode or sequence
+            The term or phrase (see :meth:`positions`).
+        n_words : int
+            Number of words of context before and after each occurrence.
+
+        Returns
+        -------
+        lines : list
+            :class:`KwicLine` instances, with ``position``, ``before``,
+            ``keyword`` and ``after`` fields, in document order.
+        """
+        n = len(self._phrase(term))
+        lines = []
+        for i in self.positions(term):
+            before, after = self.context(i, n_words=n_words, length=n)
+            keyword = u' '.join(self._tokens[i:i + n])
+            lines.append(KwicLine(i, before, keyword, after))
+        return lines
+
+    def ngram_counts(self, n=2):
+        """Frequencies of all n-grams in the text.
+
+        Counts are computed once for each ``n`` and cached.
+
+        Returns
+        -------
+        counts : :class:`collections.Counter`
+            Number of occurrences of each n-gram, keyed by tuples of
+            tokens.
+        """
+        if n not in self._ngrams:
+            tokens = self.tokens
+            with timed('concordance'):
+                self._ngrams[n] = Counter(
+                    zip(*[tokens[i:] for i in xrange(n)]))
+        return self._ngrams[n]
+
+    def _phrase(self, term):
+        """Tokens of a term or phrase."""
+        if isinstance(term, basestring):
+            self._index_postings()
+            if term in self._postings:
+                return [term]
+            return nlputils.wordify(term)
+        return list(term)
+
+
+def _char_kind(c):
+    """Kind of a character for tokenization: 0 for whitespace, 1 for word
+    characters and 2 for punctuation.
+    """
+    if _space_char.match(c):
+        return 0
+    if _word_char.match(c):
+        return 1
+    return 2
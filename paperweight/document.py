@@ -9,35 +9,57 @@ Much of the functionality of the :mod:`paperweight.texutils`,
 :mod:`paperweight.gitio` and :mod:`paperweight.nlputils` modules can be
 accessed through this interface.
 
-Depending on how the LaTeX document is stored, you should use either of two
+Depending on how the LaTeX document is stored, you should use one of three
 document classes.
 :class:`paperweight.document.FilesystemTexDocument` should be used for regular
 documents in the filesystem.
 If you wish to operate on documents stored within a certain commit of a
 checked-out Git repository, then use
 :class:`paperweight.document.GitTexDocument`.
-The interfaces for both classes are consistent since they inherit from
+Documents in a source archive (such as an arXiv ``.tar.gz`` bundle) can be
+read without extracting the archive with
+:class:`paperweight.document.ArchiveTexDocument`.
+The interfaces for these classes are consistent since they inherit from
 :class:`paperweight.document.TexDocument` under the hood.
+Documents in any other storage backend (see :mod:`paperweight.sources`) can be
+opened with :class:`paperweight.document.SourceTexDocument`.
 """
 
 import os
+import re
+from bisect import bisect_left
 from collections import OrderedDict, defaultdict
 from itertools import chain
 import codecs
+import logging
 
-from .gitio import read_git_blob
-from . import texutils, nlputils
+from .gitio import git_tree
+from .archive import TexArchive
+from .sources import FilesystemSource
+from .bibio import BibDatabase
+from .instrument import timed
+from .outline import Outline
+from .concordance import Concordance
+from .textstore import TextRope, default_store
+from . import texutils, texpath
 
 
-__all__ = ['FilesystemTexDocument', 'GitTexDocument', 'TexDocument']
+__all__ = ['FilesystemTexDocument', 'GitTexDocument', 'ArchiveTexDocument',
+           'SourceTexDocument', 'TexDocument']
 
 
 class TexDocument(object):
     """Baseclass for a tex document.
 
+    The text is held in a shared :class:`paperweight.textstore.TextBuffer`
+    (see :mod:`paperweight.textstore`); documents with the same text share
+    its storage and derived data, such as the :attr:`concordance`.
+    Assigning to :attr:`text` replaces the document's buffer, and does not
+    affect other documents.
+
     Parameters
     ----------
-    text : unicode
+    text : unicode or :class:`paperweight.textstore.TextBuffer`
         Unicode-encoded text of the latex document.
 
     Attributes
@@ -48,9 +70,23 @@ class TexDocument(object):
     def __init__(self, text):
         super(TexDocument, self).__init__()
         self.text = text
-        self.sections
         self._children = OrderedDict()
 
+    @property
+    def text(self):
+        return self._buffer.text
+
+    @text.setter
+    def text(self, text):
+        self._buffer = default_store.intern(text)
+
+    @property
+    def buffer(self):
+        """Shared :class:`paperweight.textstore.TextBuffer` of the
+        document's text.
+        """
+        return self._buffer
+
     def find_input_documents(self):
         """Find all tex documents input by this root document.
 
@@ -72,21 +108,83 @@ class TexDocument(object):
             paths.append(full_fname)
         return paths
 
+    @property
+    def outline(self):
+        """Hierarchical :class:`paperweight.outline.Outline` of the
+        sectioning commands in the document.
+
+        The outline is built once for each distinct text, and is shared by
+        documents with the same text.
+        """
+        concordance = self.concordance
+
+        def _build(text):
+            with timed('sections', chars=len(text)):
+                return Outline(text, concordance=concordance)
+
+        return self._buffer.derived('outline', _build)
+
+    @property
+    def concordance(self):
+        """Token index (:class:`paperweight.concordance.Concordance`) of
+        the document's text, shared by citation context extraction and
+        :meth:`iter_contexts`.
+
+        The index is built once for each distinct text, and is shared by
+        documents with the same text.
+        """
+        return self._buffer.derived('concordance', Concordance)
+
+    @property
+    def rope(self):
+        """Lazily flattened :class:`paperweight.textstore.TextRope` of the
+        text of the document and its input documents.
+
+        The rope is the document's text with the ``\\input`` and
+        ``\\InputIfFileExists`` commands of each opened input document
+        replaced by that document's rope (followed by the second argument
+        of ``\\InputIfFileExists``). Its segments reference the shared
+        buffers of the documents, so no text is copied until the rope is
+        converted with ``unicode()``. Unlike :meth:`inline_inputs`, comments
+        are kept (see :meth:`remove_comments`) and the document is not
+        modified.
+        """
+        replacements = []
+        itr = chain(texutils.input_pattern.finditer(self.text),
+                    texutils.input_ifexists_pattern.finditer(self.text))
+        for match in itr:
+            fname = match.group(1)
+            if not fname.endswith('.tex'):
+                fname = ".".join((fname, 'tex'))
+            if fname in self._children:
+                replacements.append((match.start(), match.end(), match))
+        replacements.sort()
+
+        buf = self._buffer
+        segments = []
+        pos = 0
+        for start, end, match in replacements:
+            if start < pos:
+                continue
+            fname = match.group(1)
+            if not fname.endswith('.tex'):
+                fname = ".".join((fname, 'tex'))
+            segments.append((buf, pos, start))
+            segments.append(self._children[fname].rope)
+            if match.re is texutils.input_ifexists_pattern:
+                segments.append(u"\n")
+                segments.append((buf, match.start(2), match.end(2)))
+            pos = end
+        segments.append((buf, pos, len(buf)))
+        return TextRope(segments)
+
     @property
     def sections(self):
         """List with tuples of section names and positions.
         Positions of section names are measured by cumulative word count.
         """
-        sections = []
-
-        for match in texutils.section_pattern.finditer(self.text):
-            textbefore = self.text[0:match.start()]
-            wordsbefore = nlputils.wordify(textbefore)
-            numwordsbefore = len(wordsbefore)
-            sections.append((numwordsbefore, match.group(1)))
-
-        self._sections = sections
-        return sections
+        return [(entry.word_start, entry.name)
+                for entry in self.outline.filter('section', starred=False)]
 
     @property
     def bib_name(self):
@@ -102,17 +200,54 @@ class TexDocument(object):
 
     @property
     def bib_path(self):
-        """Absolute file path to the .bib bibliography document."""
+        """Absolute file path to the .bib bibliography document.
+
+        The bibliography is searched for in the ``BIBINPUTS`` search path
+        (see :func:`paperweight.texpath.bib_search_path`).
+        """
         bib_name = self.bib_name
-        # FIXME need to bake in search paths for tex documents in all platforms
-        osx_path = os.path.expanduser(
-            "~/Library/texmf/bibtex/bib/{0}".format(bib_name))
-        if self._file_exists(bib_name):
-            return bib_name  # bib is in project directory
-        elif os.path.exists(osx_path):
-            return osx_path
-        else:
+        if bib_name is None:
             return None
+        return self._find_bib(bib_name)
+
+    def _find_bib(self, bib_name):
+        """Find the bibliography file in the texmf trees."""
+        return texpath.bib_search_path().find(bib_name)
+
+    @property
+    def bib_database(self):
+        """The :class:`paperweight.bibio.BibDatabase` of the .bib
+        bibliography document, or `None` if the .bib file cannot be found.
+
+        Entries of the database are indexed, not parsed, so checking cite
+        keys against a large shared bibliography is cheap.
+        """
+        bib_path = self.bib_path
+        if bib_path is None:
+            return None
+        return BibDatabase(bib_path)
+
+    @property
+    def missing_bib_keys(self):
+        """List of bib keys cited in the document (and input documents)
+        that are not in the .bib bibliography document, or
+        `None` if the .bib file cannot be found.
+        """
+        bib_database = self.bib_database
+        if bib_database is None:
+            return None
+        return bib_database.missing_keys(self.iter_bib_keys())
+
+    @property
+    def unused_bib_keys(self):
+        """List of bib keys in the .bib bibliography document that are not
+        cited in the document (or input documents), or `None` if the .bib
+        file cannot be found.
+        """
+        bib_database = self.bib_database
+        if bib_database is None:
+            return None
+        return bib_database.unused_keys(self.iter_bib_keys())
 
     def remove_comments(self, recursive=True):
         """Remove latex comments from document (modifies document in place).
@@ -122,7 +257,10 @@ class TexDocument(object):
         recursive : bool
             Remove comments from all input LaTeX documents (default ``True``).
         """
-        self.text = texutils.remove_comments(self.text)
+        # Documents with the same text share the stripped buffer
+        self._buffer = self._buffer.derived(
+            'stripped',
+            lambda text: default_store.intern(texutils.remove_comments(text)))
         if recursive:
             for path, document in self._children.iteritems():
                 document.remove_comments(recursive=True)
@@ -130,18 +268,136 @@ class TexDocument(object):
     @property
     def bib_keys(self):
         """List of all bib keys in the document (and input documents)."""
-        bib_keys = []
-        # Get bib keys in this document
+        return list(set(self.iter_bib_keys()))
+
+    def iter_bib_keys(self):
+        """Iterate over bib keys cited in the document (and input documents).
+
+        Keys are yielded in the order they are cited, walking this
+        document first and then each input document in turn. Keys cited
+        multiple times are yielded multiple times.
+
+        Yields
+        ------
+        key : unicode
+            BibTeX cite key.
+        """
         for match in texutils.cite_pattern.finditer(self.text):
-            keys = match.group(5).split(',')
-            bib_keys += keys
+            for key in _split_cite_keys(match):
+                yield key
 
         # Recursion
         for path, document in self._children.iteritems():
-            bib_keys += document.bib_keys
-        bib_keys = list(set(bib_keys))
+            for key in document.iter_bib_keys():
+                yield key
 
-        return bib_keys
+    def iter_citations(self, n_words=20, recursive=True):
+        """Iterate over citations in the document (and input documents),
+        yielding each cite key with metadata about the context of the
+        citation as it is found.
+
+        Citations are yielded in the order they appear in this document,
+        followed by citations in each input document in turn. The metadata
+        is the same as the citation instances returned by
+        :meth:`extract_citation_context`.
+
+        Parameters
+        ----------
+        n_words : int
+            Number of words before and after the citation to extract for
+            context.
+        recursive : bool
+            If `True` (default), also iterate over citations in input
+            documents.
+
+        Yields
+        ------
+        key : unicode
+            BibTeX cite key.
+        cite_instance : dict
+            Metadata of the context for the citation.
+        """
+        for match, context in self._iter_own_contexts(
+                texutils.cite_pattern, n_words, 'citations'):
+            for key in _split_cite_keys(match):
+                cite_instance = dict(context)
+                yield key, cite_instance
+
+        if not recursive:
+            return
+
+        # Recursion
+        for path, document in self._children.iteritems():
+            for key, cite_instance in document.iter_citations(n_words=n_words):
+                yield key, cite_instance
+
+    def iter_contexts(self, pattern, n_words=20):
+        """Iterate over matches of a regular expression in the document
+        (and input documents), yielding each match with the words around
+        it.
+
+        For example, ``doc.iter_contexts(r'\\ref{fig:(.*?)}')`` iterates
+        over all references to figures. Contexts are read from the
+        document's :attr:`concordance`, so the text is not re-tokenized
+        for each query.
+
+        Parameters
+        ----------
+        pattern : str or compiled regular expression
+            Pattern to search for.
+        n_words : int
+            Number of words before and after the match to extract for
+            context.
+
+        Yields
+        ------
+        match : match object
+            The match.
+        context : dict
+            Metadata of the context of the match, with the same
+            ``position``, ``wordsbefore``, ``wordsafter`` and ``section``
+            fields as the citation instances of
+            :meth:`extract_citation_context`.
+        """
+        if isinstance(pattern, basestring):
+            pattern = re.compile(pattern, re.UNICODE)
+        for match, context in self._iter_own_contexts(pattern, n_words,
+                                                      'contexts'):
+            yield match, context
+
+        # Recursion
+        for path, document in self._children.iteritems():
+            for match, context in document.iter_contexts(pattern,
+                                                         n_words=n_words):
+                yield match, context
+
+    def _iter_own_contexts(self, pattern, n_words, stage):
+        """Contexts of the matches of ``pattern`` in this document's own
+        text (see :meth:`iter_contexts`).
+        """
+        concordance = self.concordance
+        # Sections of the document's current text (e.g., after
+        # remove_comments), from the outline of its buffer
+        sections = self.sections
+        section_positions = [pos for pos, _ in sections]
+        for match in pattern.finditer(self.text):
+
+            with timed(stage, offset=match.start()):
+                position = concordance.position_at(match.start())
+                wordsbefore = concordance.words_before(match.start(),
+                                                       n_words)
+                wordsafter = concordance.words_after(match.end(), n_words)
+
+                # Last section that starts before the match
+                i = bisect_left(section_positions, position)
+                containing_section = sections[i - 1] if i > 0 else None
+
+            context = {
+                "position": position,
+                "wordsbefore": (" ".join(wordsbefore)),
+                "wordsafter": (" ".join(wordsafter)),
+                "section": containing_section}
+            yield match, context
 
     def extract_citation_context(self, n_words=20):
         """Generate a dictionary of all bib keys in the document (and input
@@ -161,6 +417,9 @@ class TexDocument(object):
         - ``section``: (unicode) name of the section in which the citation
           occurs.
 
+        Use :meth:`iter_citations` to stream citations without building
+        the full dictionary.
+
         Parameters
         ----------
         n_words : int
@@ -175,38 +434,8 @@ class TexDocument(object):
             instance metadata.
         """
         bib_keys = defaultdict(list)
-        # Get bib keys in this document
-        for match in texutils.cite_pattern.finditer(self.text):
-
-            textbefore = self.text[0:match.start()]
-            textafter = self.text[match.end():-1]
-
-            wordsbefore = nlputils.wordify(textbefore)
-            wordsafter = nlputils.wordify(textafter)
-            numwordsbefore = len(wordsbefore)
-            # numwordsafter = len(wordsafter)
-
-            containing_section = None
-            for (section_pos, section_name) in self._sections:
-                if section_pos < numwordsbefore:
-                    containing_section = (section_pos, section_name)
-
-            citebody = match.groups()
-            keys = (citebody[-1].replace(" ", "")).split(',')
-            for key in keys:
-                cite_instance = {
-                    "position": numwordsbefore,
-                    "wordsbefore": (" ".join(wordsbefore[-n_words:])),
-                    "wordsafter": (" ".join(wordsafter[:n_words])),
-                    "section": containing_section}
-                bib_keys[key] += [cite_instance]
-
-        # Recursion
-        for path, document in self._children.iteritems():
-            sub_bib_keys = document.rich_bib_keys(n_words=n_words)
-            for k, cite_instances in sub_bib_keys.iteritems():
-                bib_keys[k] += cite_instances
-
+        for key, cite_instance in self.iter_citations(n_words=n_words):
+            bib_keys[key].append(cite_instance)
         return bib_keys
 
     def write(self, path):
@@ -216,71 +445,118 @@ class TexDocument(object):
 
     @property
     def bibitems(self):
-        """List of bibitem strings appearing in the document."""
-        bibitems = []
-        lines = self.text.split('\n')
-        for i, line in enumerate(lines):
-            if line.lstrip().startswith(u'\\bibitem'):
-                # accept this line
-                # check if next line is also part of bibitem
-                # FIXME ugh, re-write
-                j = 1
-                while True:
-                    try:
-                        if (lines[i + j].startswith(u'\\bibitem') is False) \
-                                and (lines[i + j] != '\n'):
-                            line += lines[i + j]
-                        elif "\end{document}" in lines[i + j]:
-                            break
-                        else:
-                            break
-                    except IndexError:
-                        break
-                    else:
-                        print line
-                        j += 1
-                print "finished", line
-                bibitems.append(line)
-        return bibitems
-
-
-class FilesystemTexDocument(TexDocument):
-    """A TeX document derived from a file in the filesystem.
+        """List of bibitem strings appearing in the document.
+
+        Each string is an entry, from its ``\\bibitem[label]{key}`` command
+        to the end of its body. Use :meth:`iter_bibitems` for the parsed
+        keys, labels and bodies.
+        """
+        text = self.text
+        # An entry's body ends where the next \bibitem command begins
+        return [text[text.rfind(u'\\bibitem', 0, item.start):item.end].strip()
+                for item in self.iter_bibitems()]
+
+    def iter_bibitems(self):
+        """Iterate over ``\\bibitem`` entries of the document's
+        ``thebibliography`` environment (see
+        :meth:`FilesystemTexDocument.inline_bbl`).
+
+        Yields
+        ------
+        bibitem : :class:`paperweight.texutils.BibItem`
+            The parsed entry, with ``key``, ``label``, and the ``start``
+            and ``end`` character offsets of the entry's body in
+            :attr:`text`.
+        """
+        return texutils.iter_bibitems(self.text)
+
+
+class SourceTexDocument(TexDocument):
+    """A tex document read from a storage backend (see
+    :mod:`paperweight.sources`).
+
+    The concrete document classes (:class:`FilesystemTexDocument`,
+    :class:`GitTexDocument` and :class:`ArchiveTexDocument`) are
+    :class:`SourceTexDocument` instances with a particular kind of source.
+    This class can be used directly with any other
+    :class:`paperweight.sources.TexSource`.
 
     Parameters
     ----------
-    filepath : unicode
-        Path to the '.tex' on the filesystem.
+    source : :class:`paperweight.sources.TexSource`
+        Storage of the document and the documents it inputs.
+    path : str
+        Path to the document in the source.
     recursive : bool
         If `True` (default), then tex documents input by this root document
         will be opened.
+    base_dir : str
+        Directory, in the source, that input documents and bibliographies
+        are resolved against. Defaults to the directory of the document at
+        ``path``, which is appropriate for root documents.
     """
-    def __init__(self, path, recursive=True):
-        # read the tex document
-        self._filepath = os.path.abspath(path)
-        with codecs.open(path, 'r', encoding='utf-8') as f:
-            text = f.read()
-        super(FilesystemTexDocument, self).__init__(text)
+    def __init__(self, source, path, recursive=True, base_dir=None):
+        self._source = source
+        self._path = path
+        if base_dir is None:
+            base_dir = source.dirname(path)
+        self._base_dir = base_dir
+        data = source.read_bytes(path)
+        if data is None:
+            raise IOError("Cannot open {0}".format(path))
+        # Data already in the store is not decoded again
+        super(SourceTexDocument, self).__init__(
+            default_store.intern_bytes(data))
         if recursive:
+            log = logging.getLogger(__name__)
             child_paths = self.find_input_documents()
             for path in child_paths:
-                # FIXME may need to deal with path normalization here.
-                self._children[path] = FilesystemTexDocument(path,
-                                                             recursive=True)
+                child_path = self._find_file(path)
+                if child_path is None:
+                    log.warning("Cannot find input document {0}".format(path))
+                    continue
+                self._children[path] = self._open_child(child_path)
+
+    def _open_child(self, path):
+        """Open an input document at ``path`` in the source."""
+        return SourceTexDocument(self._source, path, recursive=True,
+                                 base_dir=self._base_dir)
+
+    def _find_file(self, path):
+        """Path, in the source, of a file input by the document, or `None`.
+        """
+        return self._source.find(path, self._base_dir)
+
+    def _find_bib(self, bib_name):
+        """Find the bibliography file in the source or in the texmf trees.
+        """
+        return self._source.find_bib(bib_name, self._base_dir)
 
     def _file_exists(self, path):
-        return os.path.exists(path)
+        return self._find_file(path) is not None
+
+    @property
+    def bib_database(self):
+        """The :class:`paperweight.bibio.BibDatabase` of the .bib
+        bibliography document, or `None` if the .bib file cannot be found.
+
+        Entries of the database are indexed, not parsed, so checking cite
+        keys against a large shared bibliography is cheap.
+        """
+        bib_path = self.bib_path
+        if bib_path is None:
+            return None
+        return self._source.bib_database(bib_path)
 
     def inline_bbl(self):
         """Inline a compiled bibliography (.bbl) in place of a bibliography
         environment. The document is modified in place.
         """
-        bbl_path = os.path.splitext(self._filepath)[0] + ".bbl"
-        try:
-            with codecs.open(bbl_path, 'r', encoding='utf-8') as f:
-                bbl_text = f.read()
-        except IOError:
+        bbl_path = os.path.splitext(self._path)[0] + ".bbl"
+        bbl_text = self._source.read(bbl_path)
+        if bbl_text is None:
             print("Cannot open bibliography {0}".format(bbl_path))
+            return
         self.text = texutils.inline_bbl(self.text, bbl_text)
 
     def inline_inputs(self):
@@ -288,16 +564,46 @@ class FilesystemTexDocument(TexDocument):
         inlining is accomplished recursively. The document is modified
         in place.
         """
-        self.text = texutils.inline(self.text,
-                                    os.path.dirname(self._filepath))
+        self.text = texutils.inline_source(self._source, self.text,
+                                           base_dir=self._base_dir)
         # Remove children
         self._children = {}
 
 
-class GitTexDocument(TexDocument):
+class FilesystemTexDocument(SourceTexDocument):
+    """A TeX document derived from a file in the filesystem.
+
+    Parameters
+    ----------
+    filepath : unicode
+        Path to the '.tex' on the filesystem.
+    recursive : bool
+        If `True` (default), then tex documents input by this root document
+        will be opened.
+    base_dir : str
+        Directory that input documents and bibliographies are resolved
+        against (see :mod:`paperweight.texpath`). Defaults to the directory
+        of the document at ``path``, which is appropriate for root
+        documents.
+    """
+    def __init__(self, path, recursive=True, base_dir=None):
+        # read the tex document
+        self._filepath = os.path.abspath(path)
+        super(FilesystemTexDocument, self).__init__(
+            FilesystemSource(), self._filepath, recursive=recursive,
+            base_dir=base_dir)
+
+    def _open_child(self, path):
+        return FilesystemTexDocument(path, recursive=True,
+                                     base_dir=self._base_dir)
+
+
+class GitTexDocument(SourceTexDocument):
     """A tex document derived from a file in the git repository.
 
-    .. todo:: This class is not fully implemented.
+    The document, and all documents it inputs, are read from the tree of
+    the given commit (see :class:`paperweight.gitio.GitTree`), rather than
+    from the working tree.
 
     Parameters
     ----------
@@ -309,20 +615,71 @@ class GitTexDocument(TexDocument):
         git repository.
     repo_dir : str
         Path from current working directory to the root of the git repository.
+    recursive : bool
+        If `True` (default), then tex documents input by this root document
+        will be opened.
+    base_dir : str
+        Directory, relative to the root of the repository, that input
+        documents and bibliographies are resolved against. Defaults to the
+        directory of the document at ``git_path``, which is appropriate for
+        root documents.
     """
-    def __init__(self, git_path, git_hash, repo_dir='.', recursive=True):
-        # read teh tex document
+    def __init__(self, git_path, git_hash, repo_dir='.', recursive=True,
+                 base_dir=None):
+        # read the tex document
         self._git_path = git_path
         self._git_root = repo_dir
         self._git_hash = git_hash
-        text = read_git_blob(git_hash, git_path, repo_dir=repo_dir)
-        super(GitTexDocument, self).__init__(text)
-        if recursive:
-            child_paths = self.find_input_documents()
-            for path in child_paths:
-                # FIXME may need to deal with path normalization here.
-                self._children[path] = FilesystemTexDocument(path,
-                                                             recursive=True)
+        self._tree = git_tree(git_hash, repo_dir=repo_dir)
+        super(GitTexDocument, self).__init__(
+            self._tree, git_path, recursive=recursive, base_dir=base_dir)
 
-    def _file_exists(self, path):
-        return False  # TODO need to implement file existence test in git
+    def _open_child(self, path):
+        return GitTexDocument(path, self._tree.hexsha,
+                              repo_dir=self._git_root, recursive=True,
+                              base_dir=self._base_dir)
+
+
+class ArchiveTexDocument(SourceTexDocument):
+    """A tex document derived from a file in a tar, zip or gzip archive,
+    such as an arXiv source bundle.
+
+    The archive is indexed once (see :class:`paperweight.archive.TexArchive`)
+    and is not extracted; the document and all documents it inputs are read
+    from the archive.
+
+    Parameters
+    ----------
+    archive : str or :class:`paperweight.archive.TexArchive`
+        Path to the archive file, or an already-indexed archive.
+    path : str
+        Path to the document in the archive. By default the root document
+        is found by searching for ``'\\documentclass'``.
+    recursive : bool
+        If `True` (default), then tex documents input by this root document
+        will be opened.
+    base_dir : str
+        Directory, within the archive, that input documents and
+        bibliographies are resolved against. Defaults to the directory of
+        the document at ``path``, which is appropriate for root documents.
+    """
+    def __init__(self, archive, path=None, recursive=True, base_dir=None):
+        if not isinstance(archive, TexArchive):
+            archive = TexArchive(archive)
+        self._archive = archive
+        if path is None:
+            path = archive.find_root()
+        self._archive_path = path
+        super(ArchiveTexDocument, self).__init__(
+            archive, path, recursive=recursive, base_dir=base_dir)
+
+    def _open_child(self, path):
+        return ArchiveTexDocument(self._archive, path=path, recursive=True,
+                                  base_dir=self._base_dir)
+
+
+def _split_cite_keys(match):
+    """Split the cite keys of a :data:`paperweight.texutils.cite_pattern`
+    match into a list of keys.
+    """
+    return match.group(5).replace(" ", "").split(',')
@@ -0,0 +1,281 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Columnar export of the citations and sections of a corpus of documents.
+
+A :class:`CorpusWriter` writes the citation contexts (see
+:meth:`paperweight.document.TexDocument.iter_citations`) and sections (see
+:attr:`paperweight.document.TexDocument.outline`) of many documents to two
+columnar tables in a directory, ready to be loaded as dataframes:
+
+- ``citations``: one row per cited key, with columns ``document``,
+  ``file``, ``key``, ``position``, ``wordsbefore``, ``wordsafter``,
+  ``section_position`` and ``section``.
+- ``sections``: one row per sectioning command, with columns ``document``,
+  ``file``, ``command``, ``level``, ``starred``, ``name``, ``start``,
+  ``word_start`` and ``word_count``.
+
+``document`` is the name given to each document, and ``file`` is the name
+of the input document that the row comes from, as written in its parent
+(``''`` for the root document). Positions are measured within each file.
+
+Rows are buffered and written in row groups of a fixed size, so memory use
+is bounded however large the corpus is. Tables are written as Parquet
+files (``citations.parquet``, ``sections.parquet``) if pyarrow is
+installed, or otherwise as NumPy ``.npz`` archives (``citations.npz``,
+``sections.npz``) that hold one array per column and row group; load those
+with :func:`read_npz_table`. In ``.npz`` tables, missing sections are
+written as ``''`` with a ``section_position`` of -1.
+
+Example::
+
+    with CorpusWriter('analytics/') as writer:
+        for path in paths:
+            writer.add(path, FilesystemTexDocument(path))
+"""
+
+import io
+import os
+import zipfile
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+try:
+    import numpy
+    from numpy.lib import format as npy_format
+except ImportError:
+    numpy = None
+
+
+__all__ = ['CorpusWriter', 'export_corpus', 'read_npz_table',
+           'CITATION_COLUMNS', 'SECTION_COLUMNS']
+
+
+# Columns of the citations table, as (name, type) tuples
+CITATION_COLUMNS = [('document', 'str'), ('file', 'str'), ('key', 'str'),
+                    ('position', 'int'), ('wordsbefore', 'str'),
+                    ('wordsafter', 'str'), ('section_position', 'int'),
+                    ('section', 'str')]
+
+# Columns of the sections table, as (name, type) tuples
+SECTION_COLUMNS = [('document', 'str'), ('file', 'str'), ('command', 'str'),
+                   ('level', 'int'), ('starred', 'bool'), ('name', 'str'),
+                   ('start', 'int'), ('word_start', 'int'),
+                   ('word_count', 'int')]
+
+
+class CorpusWriter(object):
+    """Writes the citations and sections of documents to columnar tables.
+
+    Parameters
+    ----------
+    path : str
+        Directory to write the tables into. It is created if it does not
+        exist.
+    format : str
+        ``'parquet'`` or ``'npz'``. By default, ``'parquet'`` if pyarrow is
+        installed, and ``'npz'`` otherwise.
+    row_group_size : int
+        Number of rows buffered in memory before they are written as a row
+        group.
+    n_words : int
+        Number of words of context before and after each citation.
+    """
+    def __init__(self, path, format=None, row_group_size=65536, n_words=20):
+        super(CorpusWriter, self).__init__()
+        if format is None:
+            format = 'parquet' if pyarrow is not None else 'npz'
+        if format == 'parquet':
+            if pyarrow is None:
+                raise ImportError("pyarrow is required for Parquet export")
+            table_class = _ParquetTable
+        elif format == 'npz':
+            if numpy is None:
+                raise ImportError("numpy is required for npz export")
+            table_class = _NpzTable
+        else:
+            raise ValueError("Unknown format {0}".format(format))
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        self.path = path
+        self.format = format
+        self.n_words = n_words
+        self.citations = _RowBuffer(
+            table_class(os.path.join(path, 'citations.' + format),
+                        CITATION_COLUMNS),
+            row_group_size)
+        self.sections = _RowBuffer(
+            table_class(os.path.join(path, 'sections.' + format),
+                        SECTION_COLUMNS),
+            row_group_size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def add(self, name, document):
+        """Add the citations and sections of a document (and its input
+        documents).
+
+        Parameters
+        ----------
+        name : unicode
+            Name of the document, written in the ``document`` column.
+        document : :class:`paperweight.document.TexDocument`
+            The document.
+        """
+        for file_name, doc in _iter_tree(document):
+            for key, cite in doc.iter_citations(n_words=self.n_words,
+                                                recursive=False):
+                section = cite['section']
+                self.citations.append(
+                    (name, file_name, key, cite['position'],
+                     cite['wordsbefore'], cite['wordsafter'],
+                     section[0] if section is not None else None,
+                     section[1] if section is not None else None))
+            for entry in doc.outline:
+                self.sections.append(
+                    (name, file_name, entry.command, entry.level,
+                     entry.starred, entry.name, entry.start,
+                     entry.word_start, entry.word_count))
+
+    def close(self):
+        """Write the remaining rows and close the tables."""
+        self.citations.close()
+        self.sections.close()
+
+
+def export_corpus(documents, path, format=None, row_group_size=65536,
+                  n_words=20):
+    """Write the citations and sections of a corpus to columnar tables (see
+    :class:`CorpusWriter`).
+
+    Parameters
+    ----------
+    documents : iterable
+        ``(name, document)`` tuples. Pass a generator that opens each
+        document as it is needed so that only one document is in memory at
+        a time.
+    path : str
+        Directory to write the tables into.
+    format : str
+        ``'parquet'`` or ``'npz'`` (see :class:`CorpusWriter`).
+    row_group_size : int
+        Number of rows in each row group.
+    n_words : int
+        Number of words of context before and after each citation.
+    """
+    with CorpusWriter(path, format=format, row_group_size=row_group_size,
+                      n_words=n_words) as writer:
+        for name, document in documents:
+            writer.add(name, document)
+
+
+def read_npz_table(path):
+    """Read a table written in ``.npz`` format.
+
+    Parameters
+    ----------
+    path : str
+        Path to the ``.npz`` file.
+
+    Returns
+    -------
+    columns : dict
+        Array of each column, keyed by column name.
+    """
+    groups = {}
+    with numpy.load(path) as npz:
+        for key in sorted(npz.files):
+            column, _ = key.rsplit('.', 1)
+            groups.setdefault(column, []).append(npz[key])
+    return dict((column, numpy.concatenate(arrays))
+                for column, arrays in groups.iteritems())
+
+
+def _iter_tree(document, file_name=u''):
+    """Iterate over ``(file name, document)`` pairs of a document tree."""
+    yield file_name, document
+    for name, child in document._children.iteritems():
+        for item in _iter_tree(child, name):
+            yield item
+
+
+class _RowBuffer(object):
+    """Buffers rows of a table and writes them in row groups."""
+    def __init__(self, table, row_group_size):
+        super(_RowBuffer, self).__init__()
+        self.table = table
+        self.row_group_size = row_group_size
+        self._rows = []
+
+    def append(self, row):
+        self._rows.append(row)
+        if len(self._rows) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if len(self._rows) > 0:
+            self.table.write_group(zip(*self._rows))
+            self._rows = []
+
+    def close(self):
+        self.flush()
+        self.table.close()
+
+
+class _ParquetTable(object):
+    """Parquet file written one row group at a time."""
+    _types = {'str': 'string', 'int': 'int64', 'bool': 'bool_'}
+
+    def __init__(self, path, columns):
+        super(_ParquetTable, self).__init__()
+        self.names = [name for name, _ in columns]
+        self.types = [getattr(pyarrow, self._types[kind])()
+                      for _, kind in columns]
+        self.schema = pyarrow.schema([pyarrow.field(name, t)
+                                      for name, t in zip(self.names,
+                                                         self.types)])
+        self._writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+
+    def write_group(self, columns):
+        arrays = [pyarrow.array(list(values), type=t)
+                  for values, t in zip(columns, self.types)]
+        table = pyarrow.Table.from_arrays(arrays, schema=self.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        self._writer.close()
+
+
+class _NpzTable(object):
+    """``.npz`` archive with one array per column and row group."""
+    _missing = {'str': u'', 'int': -1, 'bool': False}
+    _dtypes = {'str': unicode, 'int': 'int64', 'bool': bool}
+
+    def __init__(self, path, columns):
+        super(_NpzTable, self).__init__()
+        self.columns = columns
+        self._zip = zipfile.ZipFile(path, 'w', allowZip64=True)
+        self._n_groups = 0
+
+    def write_group(self, columns):
+        for (name, kind), values in zip(self.columns, columns):
+            missing = self._missing[kind]
+            values = [missing if v is None else v for v in values]
+            array = numpy.array(values, dtype=self._dtypes[kind])
+            f = io.BytesIO()
+            npy_format.write_array(f, array, allow_pickle=False)
+            self._zip.writestr('{0}.{1:06d}.npy'.format(name, self._n_groups),
+                               f.getvalue())
+        self._n_groups += 1
+
+    def close(self):
+        self._zip.close()
@@ -0,0 +1,320 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Differences in citations and sections between two commits of a LaTeX
+document.
+
+:func:`diff_commits` compares the trees of two commits with a git tree
+diff (see :meth:`paperweight.gitio.GitTree.changed_paths`) to find which
+files of the document's include tree changed, and only looks up the paths
+of that include tree in each commit. Only the changed files are
+analysed for citation contexts and sections; unchanged files have the same
+citations and sections in both commits, so they only need a cheap scan for
+cite keys, on their raw data (see :mod:`paperweight.bytescan`). Blobs that
+are in both commits are read and scanned for input documents once. The
+cost of a diff is therefore proportional to the size of the change, not
+of the manuscript.
+
+Citation positions and sections are those of
+:meth:`paperweight.document.TexDocument.iter_citations`, measured within
+each file.
+"""
+
+import difflib
+import posixpath
+from collections import OrderedDict, defaultdict
+
+from .document import TexDocument
+from .gitio import git_tree
+from .instrument import incr
+from . import bytescan
+
+
+__all__ = ['CommitDiff', 'diff_commits']
+
+
+# Minimum similarity ratio of the names, or the words, of an old and a new
+# section for the new section to be a renamed (or edited) old section
+SECTION_SIMILARITY = 0.6
+
+
+class CommitDiff(object):
+    """Differences in citations and sections between two commits.
+
+    Attributes
+    ----------
+    ref_a, ref_b : str
+        SHAs of the old and new commits.
+    added_paths, removed_paths, changed_paths : list
+        Paths of files in the document's include tree that were added,
+        removed, or changed between the commits.
+    added_keys, removed_keys : list
+        Sorted cite keys cited in the new document but not the old one,
+        and vice versa.
+    moved_citations : list
+        Citations of a key that remain in the same file but whose order
+        among the file's citations, or section, changed. Edits that only
+        shift the word positions of citations do not move them. Each is a
+        dictionary with ``key``, ``path``, ``old_position``,
+        ``new_position``, ``old_section`` and ``new_section`` fields.
+    added_sections, removed_sections : list
+        ``(path, section name)`` tuples of sections that were added or
+        removed.
+    renamed_sections : list
+        ``(path, old name, new name)`` tuples of sections that were renamed.
+    """
+    def __init__(self, ref_a, ref_b):
+        super(CommitDiff, self).__init__()
+        self.ref_a = ref_a
+        self.ref_b = ref_b
+        self.added_paths = []
+        self.removed_paths = []
+        self.changed_paths = []
+        self.added_keys = []
+        self.removed_keys = []
+        self.moved_citations = []
+        self.added_sections = []
+        self.removed_sections = []
+        self.renamed_sections = []
+
+    def __repr__(self):
+        return ('<CommitDiff {0}..{1}: {2:d} changed files, '
+                '+{3:d}/-{4:d} keys, {5:d} moved citations, '
+                '{6:d} renamed sections>').format(
+            self.ref_a[:7], self.ref_b[:7],
+            len(self.added_paths) + len(self.removed_paths)
+            + len(self.changed_paths),
+            len(self.added_keys), len(self.removed_keys),
+            len(self.moved_citations), len(self.renamed_sections))
+
+
+def diff_commits(root_path, ref_a, ref_b, repo_dir='.'):
+    """Find the citations and sections that changed between two commits
+    of a LaTeX document.
+
+    Parameters
+    ----------
+    root_path : str
+        Path to the root document in the git repository, relative to the
+        root of the repository.
+    ref_a : str
+        Any SHA or git tag of the old commit.
+    ref_b : str
+        Any SHA or git tag of the new commit.
+    repo_dir : str
+        Path from current working directory to the root of the git repository.
+
+    Returns
+    -------
+    diff : :class:`CommitDiff`
+        The differences.
+    """
+    tree_a = git_tree(ref_a, repo_dir=repo_dir)
+    tree_b = git_tree(ref_b, repo_dir=repo_dir)
+    base_dir = posixpath.dirname(root_path)
+    blobs = {}
+    files_a = _include_tree(tree_a, root_path, base_dir, blobs)
+    files_b = _include_tree(tree_b, root_path, base_dir, blobs)
+
+    changed_paths = tree_a.changed_paths(tree_b)
+
+    diff = CommitDiff(tree_a.hexsha, tree_b.hexsha)
+    unchanged_keys = set()
+    changed_keys_a = set()
+    changed_keys_b = set()
+    for path in files_b:
+        if path not in files_a:
+            diff.added_paths.append(path)
+        elif path in changed_paths:
+            diff.changed_paths.append(path)
+    for path in files_a:
+        if path not in files_b:
+            diff.removed_paths.append(path)
+        elif path not in changed_paths:
+            # Unchanged: a cheap scan for cite keys is all that's needed
+            unchanged_keys.update(_cite_keys(files_a[path]))
+
+    for path in diff.added_paths:
+        changed_keys_b.update(_cite_keys(files_b[path]))
+        doc = _document(files_b[path])
+        diff.added_sections.extend((path, name) for _, name in doc.sections)
+    for path in diff.removed_paths:
+        changed_keys_a.update(_cite_keys(files_a[path]))
+        doc = _document(files_a[path])
+        diff.removed_sections.extend((path, name)
+                                     for _, name in doc.sections)
+    for path in diff.changed_paths:
+        changed_keys_a.update(_cite_keys(files_a[path]))
+        changed_keys_b.update(_cite_keys(files_b[path]))
+        _diff_file(diff, path, _document(files_a[path]),
+                   _document(files_b[path]))
+
+    diff.added_keys = sorted(changed_keys_b - changed_keys_a - unchanged_keys)
+    diff.removed_keys = sorted(changed_keys_a - changed_keys_b
+                               - unchanged_keys)
+    return diff
+
+
+def _include_tree(tree, root_path, base_dir, blobs):
+    """Raw data of the files in a document's include tree, keyed by path.
+
+    ``blobs`` holds the data and input names of each blob read so far,
+    keyed by blob SHA. Blobs in it (e.g., files unchanged since another
+    commit) are not read or scanned again.
+    """
+    files = OrderedDict()
+    pending = [root_path]
+    while len(pending) > 0:
+        path = pending.pop(0)
+        if path in files:
+            continue
+        sha = tree.blob_sha(path)
+        if sha is None:
+            continue
+        if sha in blobs:
+            incr('gitdiff_blobs_reused')
+            data, names = blobs[sha]
+        else:
+            data = tree.read_bytes(path)
+            names = list(bytescan.iter_input_names(data))
+            blobs[sha] = (data, names)
+        files[path] = data
+        for name in names:
+            child_path = tree.find(name, base_dir)
+            if child_path is not None:
+                pending.append(child_path)
+    return files
+
+
+def _cite_keys(data):
+    """Set of cite keys in the raw data of a file."""
+    return set(bytescan.iter_cite_keys(data))
+
+
+def _document(data):
+    """:class:`paperweight.document.TexDocument` of the raw data of a
+    file.
+    """
+    return TexDocument(data.decode('utf-8'))
+
+
+def _diff_file(diff, path, doc_a, doc_b):
+    """Add the citation and section differences of a changed file."""
+    # Sections
+    sections_a = doc_a.sections
+    sections_b = doc_b.sections
+    names_a = [name for _, name in sections_a]
+    names_b = [name for _, name in sections_b]
+    # Index of each old section's counterpart among the new sections.
+    # Sections with the same name in the same order are counterparts, and
+    # the others are paired by the similarity of their names or text.
+    section_map = {None: None}
+    matcher = difflib.SequenceMatcher(None, names_a, names_b, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            section_map.update(zip(xrange(i1, i2), xrange(j1, j2)))
+            continue
+        pairs = _pair_sections(doc_a, xrange(i1, i2), doc_b, xrange(j1, j2))
+        section_map.update(pairs)
+        for i, j in pairs:
+            if names_a[i] != names_b[j]:
+                diff.renamed_sections.append((path, names_a[i], names_b[j]))
+        paired_a = set(i for i, _ in pairs)
+        paired_b = set(j for _, j in pairs)
+        diff.removed_sections.extend((path, names_a[i])
+                                     for i in xrange(i1, i2)
+                                     if i not in paired_a)
+        diff.added_sections.extend((path, names_b[j])
+                                   for j in xrange(j1, j2)
+                                   if j not in paired_b)
+    section_index_a = _section_indices(sections_a)
+    section_index_b = _section_indices(sections_b)
+
+    # Citations that keep their order are those in the longest common
+    # subsequence of the files' sequences of cited keys
+    cites_a = list(doc_a.iter_citations(n_words=1))
+    cites_b = list(doc_b.iter_citations(n_words=1))
+    keys_a = [key for key, _ in cites_a]
+    keys_b = [key for key, _ in cites_b]
+    matcher = difflib.SequenceMatcher(None, keys_a, keys_b, autojunk=False)
+    in_order = {}
+    for i, j, n in matcher.get_matching_blocks():
+        in_order.update(zip(xrange(i, i + n), xrange(j, j + n)))
+    # Other citations of a key are matched in document order
+    unmatched_b = defaultdict(list)
+    matched_b = set(in_order.itervalues())
+    for j, key in enumerate(keys_b):
+        if j not in matched_b:
+            unmatched_b[key].append(j)
+    for i, key in enumerate(keys_a):
+        if i in in_order:
+            j = in_order[i]
+        elif len(unmatched_b[key]) > 0:
+            j = unmatched_b[key].pop(0)
+        else:
+            continue
+        old = cites_a[i][1]
+        new = cites_b[j][1]
+        new_section = section_index_b[new['section']]
+        if i not in in_order \
+                or section_map.get(section_index_a[old['section']], -1) \
+                != new_section:
+            diff.moved_citations.append({
+                'key': key,
+                'path': path,
+                'old_position': old['position'],
+                'new_position': new['position'],
+                'old_section': old['section'],
+                'new_section': new['section']})
+
+
+def _pair_sections(doc_a, indices_a, doc_b, indices_b):
+    """Pair old and new sections that are similar, in order.
+
+    A section is similar to another if the ratio of their names, or of
+    their words, is at least :data:`SECTION_SIMILARITY`. The most similar
+    pairs are taken first, skipping pairs that would cross a pair already
+    taken.
+
+    Returns
+    -------
+    pairs : list
+        Sorted ``(old index, new index)`` tuples, of sections of
+        :attr:`paperweight.document.TexDocument.sections`.
+    """
+    entries_a = doc_a.outline.filter('section', starred=False)
+    entries_b = doc_b.outline.filter('section', starred=False)
+    words_b = dict((j, _section_words(doc_b, entries_b[j]))
+                   for j in indices_b)
+    candidates = []
+    for i in indices_a:
+        words_a = _section_words(doc_a, entries_a[i])
+        for j in indices_b:
+            score = difflib.SequenceMatcher(None, entries_a[i].name,
+                                            entries_b[j].name).ratio()
+            if score < SECTION_SIMILARITY:
+                matcher = difflib.SequenceMatcher(None, words_a, words_b[j])
+                if matcher.quick_ratio() >= SECTION_SIMILARITY:
+                    score = max(score, matcher.ratio())
+            if score >= SECTION_SIMILARITY:
+                candidates.append((-score, i, j))
+    pairs = []
+    for _, i, j in sorted(candidates):
+        if all((i < i2) == (j < j2) and i != i2 and j != j2
+               for i2, j2 in pairs):
+            pairs.append((i, j))
+    return sorted(pairs)
+
+
+def _section_words(doc, entry):
+    """List of the words of a section, after its sectioning command."""
+    return doc.text[entry.start:entry.end].split()[1:]
+
+
+def _section_indices(sections):
+    """Index of each section of a document, keyed by section (and `None`
+    for no section).
+    """
+    indices = dict((section, i) for i, section in enumerate(sections))
+    indices[None] = None
+    return indices
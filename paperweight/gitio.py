@@ -6,9 +6,263 @@ Utilities for reading content in git repositories.
 
 import git
 import os
+import posixpath
+import threading
+from collections import OrderedDict
 
+from .instrument import incr, timed
+from .sources import TexSource, _list_prefix
 
-__all__ = ['read_git_blob', 'absolute_git_root_dir']
+
+__all__ = ['read_git_blob', 'absolute_git_root_dir', 'GitTree', 'git_tree',
+           'clear_cache']
+
+
+# Cache of opened repositories, keyed by absolute repository directory
+_repo_cache = {}
+# Locks that serialize access to each repository's object database, keyed
+# by absolute repository directory
+_repo_locks = {}
+# Cache of GitTree indices, keyed by (absolute repository directory, SHA)
+_tree_cache = OrderedDict()
+TREE_CACHE_SIZE = 32
+# Lock of the repository and tree caches
+_cache_lock = threading.RLock()
+
+
+class GitTree(TexSource):
+    """Index of the blobs in the tree of a git commit.
+
+    Each path is looked up once, through the commit's tree objects, and
+    its blob is remembered, so that checking whether a file exists, or
+    reading it, does not re-open the repository or walk the tree again.
+    The whole tree is only traversed to list its paths. Use
+    :func:`git_tree` to get a cached instance. Blobs are read under a lock
+    of the repository, so a tree may be shared by threads. A
+    :class:`GitTree` is a :class:`paperweight.sources.TexSource` whose
+    paths are relative to the root of the repository.
+
+    Parameters
+    ----------
+    commit_ref : str
+        Any SHA or git tag that can resolve into a commit in the
+        git repository.
+    repo_dir : str
+        Path from current working directory to the root of the git repository.
+
+    Attributes
+    ----------
+    commit : :class:`git.Commit`
+        The commit.
+    hexsha : str
+        SHA of the commit.
+    """
+    # Blobs share the repository's object database, so they are read under
+    # the repository's lock
+    thread_safe = True
+
+    def __init__(self, commit_ref, repo_dir='.'):
+        super(GitTree, self).__init__()
+        repo = _open_repo(repo_dir)
+        self._lock = _repo_locks[os.path.abspath(repo_dir)]
+        with self._lock, timed('git_tree'):
+            self.commit = repo.commit(commit_ref)
+            self.hexsha = self.commit.hexsha
+        # Blobs (or None for paths without a blob) and trees, keyed by path
+        self._blobs = {}
+        self._trees = {'': self.commit.tree}
+        self._traversed = False
+
+    def _blob(self, path):
+        """Blob at ``path``, or `None` if it does not exist."""
+        path = _normpath(path)
+        try:
+            return self._blobs[path]
+        except KeyError:
+            pass
+        with self._lock:
+            if self._traversed:
+                blob = None
+            else:
+                dirname, name = posixpath.split(path)
+                blob = self._item(self._tree(dirname), name, 'blob')
+            self._blobs[path] = blob
+        return blob
+
+    def _tree(self, path):
+        """Tree object of the directory at ``path``, or `None`."""
+        if path in ('', '.'):
+            path = ''
+        try:
+            return self._trees[path]
+        except KeyError:
+            pass
+        dirname, name = posixpath.split(path)
+        tree = self._item(self._tree(dirname), name, 'tree')
+        self._trees[path] = tree
+        return tree
+
+    def _item(self, tree, name, item_type):
+        """Item ``name`` of type ``item_type`` in a tree object, or
+        `None`.
+        """
+        if tree is None or name in ('', '.', '..'):
+            return None
+        try:
+            item = tree[name]
+        except KeyError:
+            return None
+        return item if item.type == item_type else None
+
+    def paths(self):
+        """List of paths of all blobs in the tree, relative to the root
+        of the repository.
+        """
+        with self._lock:
+            if not self._traversed:
+                with timed('git_tree'):
+                    for item in self.commit.tree.traverse():
+                        if item.type == 'blob':
+                            self._blobs[item.path] = item
+                # Only blobs that were found are remembered
+                for path in [p for p, b in self._blobs.iteritems()
+                             if b is None]:
+                    del self._blobs[path]
+                self._traversed = True
+            return self._blobs.keys()
+
+    def changed_paths(self, other):
+        """Paths of the blobs that differ between this tree and another.
+
+        The trees are compared with a git tree diff, which skips
+        subtrees that are the same in both, so its cost depends on the
+        size of the change rather than of the trees.
+
+        Parameters
+        ----------
+        other : :class:`GitTree`
+            Tree of another commit in the same repository.
+
+        Returns
+        -------
+        paths : set
+            Paths, relative to the root of the repository, of blobs that
+            were added, removed or changed.
+        """
+        paths = set()
+        with self._lock, timed('git_diff'):
+            for d in self.commit.diff(other.commit):
+                for blob in (d.a_blob, d.b_blob):
+                    if blob is not None:
+                        paths.add(blob.path)
+        return paths
+
+    def exists(self, path):
+        """`True` if a blob exists at ``path``, relative to the root
+        of the repository.
+        """
+        return self._blob(path) is not None
+
+    def blob_sha(self, path):
+        """SHA of the blob at ``path``, or `None` if it does not exist."""
+        blob = self._blob(path)
+        if blob is None:
+            return None
+        return blob.hexsha
+
+    def read_bytes(self, path):
+        """Read the data of the blob at ``path`` (relative to the root of
+        the repository), or `None` if the blob does not exist.
+        """
+        blob = self._blob(path)
+        if blob is None:
+            return None
+        with self._lock, timed('git', path=path, commit=self.hexsha) as t:
+            data = blob.data_stream.read()
+            t.annotate(bytes=len(data))
+        incr('git_blobs_read')
+        incr('git_bytes_read', len(data))
+        return data
+
+    def list(self, base_dir=''):
+        """List of the paths of all blobs within the directory ``base_dir``
+        (relative to the root of the repository).
+        """
+        return _list_prefix(self.paths(), base_dir)
+
+    def content_id(self, path):
+        """SHA of the blob at ``path``, or `None` if it does not exist."""
+        return self.blob_sha(path)
+
+
+def git_tree(commit_ref, repo_dir='.'):
+    """Get the (cached) :class:`GitTree` of a commit.
+
+    Repositories are opened once per process and the trees of the most
+    recently used commits are cached.
+
+    Parameters
+    ----------
+    commit_ref : str
+        Any SHA or git tag that can resolve into a commit in the
+        git repository.
+    repo_dir : str
+        Path from current working directory to the root of the git repository.
+
+    Returns
+    -------
+    tree : :class:`GitTree`
+        Index of the commit's tree.
+    """
+    repo = _open_repo(repo_dir)
+    repo_dir = os.path.abspath(repo_dir)
+    with _repo_locks[repo_dir]:
+        hexsha = repo.commit(commit_ref).hexsha
+    key = (repo_dir, hexsha)
+    with _cache_lock:
+        try:
+            tree = _tree_cache.pop(key)
+            incr('git_tree_cache_hits')
+        except KeyError:
+            incr('git_tree_cache_misses')
+            tree = GitTree(hexsha, repo_dir=repo_dir)
+            if len(_tree_cache) >= TREE_CACHE_SIZE:
+                _tree_cache.popitem(last=False)
+        _tree_cache[key] = tree
+    return tree
+
+
+def clear_cache():
+    """Clear the caches of opened repositories and commit trees."""
+    with _cache_lock:
+        _repo_cache.clear()
+        _tree_cache.clear()
+
+
+def _open_repo(repo_dir):
+    """Get the (cached) :class:`git.Repo` for a repository directory.
+
+    The repository's lock is in ``_repo_locks``.
+    """
+    repo_dir = os.path.abspath(repo_dir)
+    with _cache_lock:
+        try:
+            repo = _repo_cache[repo_dir]
+            incr('git_repo_cache_hits')
+            return repo
+        except KeyError:
+            incr('git_repo_cache_misses')
+            incr('git_repos_opened')
+            with timed('git_open'):
+                repo = git.Repo(repo_dir)
+            _repo_cache[repo_dir] = repo
+            _repo_locks.setdefault(repo_dir, threading.RLock())
+            return repo
+
+
+def _normpath(path):
+    """Normalize a path to the form of paths in git trees."""
+    return posixpath.normpath(path.replace(os.sep, '/'))
 
 
 def read_git_blob(commit_ref, path, repo_dir='.'):
@@ -28,40 +282,9 @@ def read_git_blob(commit_ref, path, repo_dir='.'):
     Returns
     -------
     text : unicode
-        The document text.
+        The document text, or `None` if the blob does not exist.
     """
-    repo = git.Repo(repo_dir)
-    tree = repo.tree(commit_ref)
-    dirname, fname = os.path.split(path)
-    text = None
-    if dirname == '':
-        text = _read_blob(tree, fname)
-    else:
-        components = path.split(os.sep)
-        text = _read_blob_in_tree(tree, components)
-    return text
-
-
-def _read_blob_in_tree(tree, components):
-    """Recursively open trees to ultimately read a blob"""
-    if len(components) == 1:
-        # Tree is direct parent of blob
-        return _read_blob(tree, components[0])
-    else:
-        # Still trees to open
-        dirname = components.pop(0)
-        for t in tree.traverse():
-            if t.name == dirname:
-                return _read_blob_in_tree(t, components)
-
-
-def _read_blob(tree, filename):
-    for blb in tree.blobs:
-        if blb.name == filename:
-            txt = unicode(blb.data_stream.read(), 'utf-8')
-            # txt = txt.encode('utf-8')
-            return txt
-    return None
+    return git_tree(commit_ref, repo_dir=repo_dir).read(path)
 
 
 def absolute_git_root_dir(fpath=""):
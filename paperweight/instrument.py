@@ -0,0 +1,319 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Opt-in timing and counter instrumentation of paperweight's hot paths.
+
+Instrumentation is off until statistics are collected with
+:func:`collect_stats`::
+
+    from paperweight.instrument import collect_stats
+
+    with collect_stats() as stats:
+        doc = FilesystemTexDocument('paper.tex')
+        doc.extract_citation_context()
+    print(stats.report())
+
+While collecting, paperweight records per-stage timers (e.g., ``'read'``,
+``'git'``, ``'tokenize'``, ``'sections'``, ``'citations'``) and counters
+(e.g., ``'files_read'``, ``'bytes_read'``, ``'git_repos_opened'``,
+``'git_blobs_read'``, ``'wordify_calls'``, ``'wordify_tokens'``, and
+``'<cache>_cache_hits'``/``'<cache>_cache_misses'`` for each cache).
+Timers are inclusive: the time of a stage includes the time of any
+stages nested within it.
+
+Tracing tools can also be called at the start and end of each stage,
+with metadata about the work done, by registering a hook with
+:func:`register_hook`::
+
+    def on_end(event):
+        exporter.export(event.stage, event.elapsed, event.metadata)
+
+    with register_hook(end=on_end, stages=['read', 'git', 'inline']):
+        doc = GitTexDocument('paper.tex', 'v1.0')
+
+Hooked stages and their metadata are:
+
+- ``'read'``: a file is read (``path``, ``bytes``).
+- ``'git'``: a git blob is read (``path``, ``commit``, ``bytes``).
+- ``'inline'``: input documents are inlined into a text (``base_dir``,
+  ``chars``).
+- ``'tokenize'``: a text is tokenized into words (``chars``, ``words``).
+- ``'sections'``: the sections of a document are scanned (``chars``).
+- ``'citations'``: the context of a citation is extracted (``offset``).
+
+When no statistics are being collected and no hooks are registered,
+instrumentation costs a single list truthiness test per call, so it can be
+left in place in production. Collection and hooks are process-wide (not
+per thread); collectors may be nested, and each records everything that
+happens while it is active.
+"""
+
+import time
+import logging
+from collections import defaultdict
+
+
+__all__ = ['Stats', 'collect_stats', 'incr', 'timed', 'Hook',
+           'StageEvent', 'register_hook', 'unregister_hook']
+
+
+# Stack of Stats instances that are currently collecting
+_collectors = []
+
+# Registered Hook instances
+_hooks = []
+
+
+class Stats(object):
+    """Timers and counters collected by :func:`collect_stats`.
+
+    Attributes
+    ----------
+    counters : dict
+        Counts, keyed by counter name.
+    timers : dict
+        Cumulative wall-clock time in seconds, keyed by stage name.
+    calls : dict
+        Number of times each stage was entered, keyed by stage name.
+    """
+    def __init__(self):
+        super(Stats, self).__init__()
+        self.counters = defaultdict(int)
+        self.timers = defaultdict(float)
+        self.calls = defaultdict(int)
+
+    def __repr__(self):
+        return '<Stats counters={0!r} timers={1!r}>'.format(
+            dict(self.counters), dict(self.timers))
+
+    def as_dict(self):
+        """Statistics as a plain dictionary with ``'counters'``,
+        ``'timers'`` and ``'calls'`` keys.
+        """
+        return {'counters': dict(self.counters),
+                'timers': dict(self.timers),
+                'calls': dict(self.calls)}
+
+    def report(self):
+        """Format the statistics as a plain-text table.
+
+        Returns
+        -------
+        text : str
+            Table of stage timers (slowest first) and counters.
+        """
+        lines = []
+        for stage, seconds in sorted(self.timers.items(),
+                                     key=lambda item: -item[1]):
+            lines.append('{0:<30s} {1:10.4f} s {2:8d} calls'.format(
+                stage, seconds, self.calls[stage]))
+        for name, count in sorted(self.counters.items()):
+            lines.append('{0:<30s} {1:12d}'.format(name, count))
+        return '\n'.join(lines)
+
+
+class collect_stats(object):
+    """Context manager that collects statistics while it is active.
+
+    Parameters
+    ----------
+    stats : :class:`Stats`
+        Statistics to add to. A new :class:`Stats` is made by default.
+
+    Returns
+    -------
+    stats : :class:`Stats`
+        The statistics, returned by the ``with`` statement.
+    """
+    def __init__(self, stats=None):
+        if stats is None:
+            stats = Stats()
+        self.stats = stats
+
+    def __enter__(self):
+        _collectors.append(self.stats)
+        return self.stats
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _collectors.remove(self.stats)
+        return False
+
+
+def incr(name, n=1):
+    """Increment a counter of all active collectors.
+
+    Parameters
+    ----------
+    name : str
+        Name of the counter.
+    n : int
+        Amount to increment the counter by.
+    """
+    if _collectors:
+        for stats in _collectors:
+            stats.counters[name] += n
+
+
+class timed(object):
+    """Context manager that times a stage for all active collectors, and
+    calls the registered hooks at the start and end of the stage.
+
+    Parameters
+    ----------
+    stage : str
+        Name of the stage.
+    metadata : dict
+        Metadata of the stage passed to hooks, as keyword arguments.
+        Metadata known only during the stage can be added with
+        :meth:`annotate`.
+    """
+    __slots__ = ('stage', 'start', 'metadata', 'event')
+
+    def __init__(self, stage, **metadata):
+        self.stage = stage
+        self.start = None
+        self.metadata = metadata
+        self.event = None
+
+    def __enter__(self):
+        if _collectors or _hooks:
+            self.start = time.time()
+            if _hooks:
+                self.event = _start_event(self.stage, self.metadata,
+                                          self.start)
+        return self
+
+    def annotate(self, **metadata):
+        """Add metadata of the stage, such as the number of bytes read."""
+        if self.event is not None:
+            self.metadata.update(metadata)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.start is not None:
+            elapsed = time.time() - self.start
+            for stats in _collectors:
+                stats.timers[self.stage] += elapsed
+                stats.calls[self.stage] += 1
+            if self.event is not None:
+                _end_event(self.event, elapsed, exc_value)
+        return False
+
+
+class StageEvent(object):
+    """A stage of work, as passed to hook callbacks.
+
+    Callbacks may set other attributes on the event, such as a tracing
+    span created when the stage starts, to use when it ends.
+
+    Attributes
+    ----------
+    stage : str
+        Name of the stage (e.g., ``'read'``).
+    metadata : dict
+        Metadata of the stage (e.g., ``path`` and ``bytes``). Metadata
+        added during the stage is present when the stage ends.
+    start_time : float
+        Time the stage started, in seconds since the epoch.
+    elapsed : float
+        Wall-clock duration of the stage in seconds, or `None` until the
+        stage ends.
+    error : Exception
+        Exception raised in the stage, or `None`.
+    """
+    def __init__(self, stage, metadata, start_time, hooks):
+        super(StageEvent, self).__init__()
+        self.stage = stage
+        self.metadata = metadata
+        self.start_time = start_time
+        self.elapsed = None
+        self.error = None
+        self._hooks = hooks
+
+
+class Hook(object):
+    """Callbacks registered with :func:`register_hook`.
+
+    A hook can be used as a context manager that unregisters it on exit.
+
+    Parameters
+    ----------
+    start : function
+        Called with the :class:`StageEvent` when a stage starts.
+    end : function
+        Called with the :class:`StageEvent` when a stage ends.
+    stages : list
+        Names of the stages to call back for. All stages by default.
+    """
+    def __init__(self, start=None, end=None, stages=None):
+        super(Hook, self).__init__()
+        self.start = start
+        self.end = end
+        self.stages = frozenset(stages) if stages is not None else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        unregister_hook(self)
+        return False
+
+
+def register_hook(start=None, end=None, stages=None):
+    """Register callbacks for the start and end of stages.
+
+    Parameters
+    ----------
+    start : function
+        Called with a :class:`StageEvent` when a stage starts.
+    end : function
+        Called with the same :class:`StageEvent` when the stage ends.
+    stages : list
+        Names of the stages to call back for (e.g., ``['read', 'git']``).
+        All stages by default.
+
+    Returns
+    -------
+    hook : :class:`Hook`
+        The registered hook, to pass to :func:`unregister_hook`.
+    """
+    hook = Hook(start=start, end=end, stages=stages)
+    _hooks.append(hook)
+    return hook
+
+
+def unregister_hook(hook):
+    """Unregister a :class:`Hook` returned by :func:`register_hook`."""
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+def _start_event(stage, metadata, start_time):
+    """Make the event of a stage and call the start callbacks."""
+    hooks = [hook for hook in _hooks
+             if hook.stages is None or stage in hook.stages]
+    if not hooks:
+        return None
+    event = StageEvent(stage, metadata, start_time, hooks)
+    for hook in hooks:
+        if hook.start is not None:
+            _call(hook.start, event)
+    return event
+
+
+def _end_event(event, elapsed, error):
+    """Call the end callbacks of the hooks that saw a stage start."""
+    event.elapsed = elapsed
+    event.error = error
+    for hook in event._hooks:
+        if hook.end is not None:
+            _call(hook.end, event)
+
+
+def _call(callback, event):
+    # A failing callback must not break document processing
+    try:
+        callback(event)
+    except Exception:
+        log = logging.getLogger(__name__)
+        log.warning("Hook callback {0!r} failed for stage {1}".format(
+            callback, event.stage), exc_info=True)
@@ -6,6 +6,12 @@ Utility functions for working with NLTK
 
 import nltk
 
+from .instrument import incr, timed
+
+
+# Cached English stop words (see _stopset)
+_stopwords = None
+
 
 def wordify(text):
     """Generate a list of words given text, removing punctuation.
@@ -20,6 +26,46 @@ def wordify(text):
     words : list
         List of words.
     """
-    stopset = set(nltk.corpus.stopwords.words('english'))
-    tokens = nltk.WordPunctTokenizer().tokenize(text)
-    return [w for w in tokens if w not in stopset]
+    with timed('tokenize', chars=len(text)) as t:
+        stopset = _stopset()
+        tokens = nltk.WordPunctTokenizer().tokenize(text)
+        words = [w for w in tokens if w not in stopset]
+        t.annotate(words=len(words))
+    incr('wordify_calls')
+    incr('wordify_tokens', len(words))
+    return words
+
+
+def wordify_spans(text):
+    """Generate a list of the character spans of the words in a text, as
+    tokenized by :func:`wordify`.
+
+    Parameters
+    ----------
+    text : unicode
+        A piece of english text.
+
+    Returns
+    -------
+    spans : list
+        List of ``(start, end)`` character offsets of the words; the
+        ``i``-th span corresponds to the ``i``-th word of
+        ``wordify(text)``.
+    """
+    with timed('tokenize', chars=len(text)) as t:
+        stopset = _stopset()
+        spans = [(start, end) for start, end
+                 in nltk.WordPunctTokenizer().span_tokenize(text)
+                 if text[start:end] not in stopset]
+        t.annotate(words=len(spans))
+    incr('wordify_calls')
+    incr('wordify_tokens', len(spans))
+    return spans
+
+
+def _stopset():
+    """Set of English stop words, loaded from the NLTK corpus once."""
+    global _stopwords
+    if _stopwords is None:
+        _stopwords = frozenset(nltk.corpus.stopwords.words('english'))
+    return _stopwords
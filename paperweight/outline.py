@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Hierarchical outline of the sectioning commands of a LaTeX document.
+
+An :class:`Outline` indexes the ``\\part``, ``\\chapter``, ``\\section``,
+``\\subsection`` and ``\\subsubsection`` commands (and their starred
+variants) of a document as nested intervals of character offsets and of
+cumulative word counts (as counted by
+:func:`paperweight.nlputils.wordify`). Word positions are read from a
+:class:`paperweight.concordance.Concordance`, so the text is tokenized at
+most once, and "which section contains this offset" is answered by a
+binary search.
+"""
+
+from bisect import bisect_right
+
+from .concordance import Concordance
+from . import texutils
+
+
+__all__ = ['Outline', 'OutlineEntry', 'SECTION_LEVELS']
+
+
+# Sectioning commands, from the top of the hierarchy down
+SECTION_LEVELS = ('part', 'chapter', 'section', 'subsection',
+                  'subsubsection')
+
+
+class OutlineEntry(object):
+    """A sectioning command and the interval of the document it spans.
+
+    Attributes
+    ----------
+    command : str
+        Sectioning command (e.g., ``'subsection'``).
+    level : int
+        Depth of the command in :data:`SECTION_LEVELS` (``'part'`` is 0).
+    starred : bool
+        `True` for starred (unnumbered) commands such as ``\\section*``.
+    name : unicode
+        Title of the section.
+    start : int
+        Character offset of the sectioning command.
+    end : int
+        Character offset where the section ends: the start of the next
+        sectioning command at the same or a higher level, or the end of
+        the text.
+    word_start, word_end : int
+        Cumulative word counts at ``start`` and ``end``.
+    parent : :class:`OutlineEntry`
+        Enclosing section, or `None` for top-level sections.
+    children : list
+        Sections nested directly within this section.
+    """
+    __slots__ = ('command', 'level', 'starred', 'name', 'start', 'end',
+                 'word_start', 'word_end', 'parent', 'children')
+
+    def __init__(self, command, starred, name, start):
+        self.command = command
+        self.level = SECTION_LEVELS.index(command)
+        self.starred = starred
+        self.name = name
+        self.start = start
+        self.end = None
+        self.word_start = None
+        self.word_end = None
+        self.parent = None
+        self.children = []
+
+    def __repr__(self):
+        return '<OutlineEntry {0}{1} {2!r} [{3:d}:{4:d}]>'.format(
+            self.command, '*' if self.starred else '', self.name,
+            self.start, self.end)
+
+    @property
+    def word_count(self):
+        """Number of words in the section (including nested sections)."""
+        return self.word_end - self.word_start
+
+    @property
+    def path(self):
+        """List of entries from the top-level section down to this one."""
+        entries = []
+        entry = self
+        while entry is not None:
+            entries.append(entry)
+            entry = entry.parent
+        return entries[::-1]
+
+
+class Outline(object):
+    """Hierarchical index of the sections of a document.
+
+    Parameters
+    ----------
+    text : unicode
+        Text of the latex document.
+    concordance : :class:`paperweight.concordance.Concordance`
+        Token index of ``text`` used to measure word positions. By default
+        a new index is built if the text has sectioning commands.
+
+    Attributes
+    ----------
+    text : unicode
+        Text of the latex document.
+    entries : list
+        All :class:`OutlineEntry` instances, in document order.
+    roots : list
+        Top-level entries.
+    """
+    def __init__(self, text, concordance=None):
+        super(Outline, self).__init__()
+        self.text = text
+        self.entries = []
+        self.roots = []
+        for match in texutils.sectioning_pattern.finditer(text):
+            self.entries.append(OutlineEntry(match.group(1),
+                                             match.group(2) == u'*',
+                                             match.group(3),
+                                             match.start()))
+        self._starts = [entry.start for entry in self.entries]
+        if concordance is None and len(self.entries) > 0:
+            concordance = Concordance(text)
+        # Only tokenized if there are sections to measure
+        self._concordance = concordance
+        self._build_tree()
+        self._word_starts = [entry.word_start for entry in self.entries]
+
+    def _build_tree(self):
+        """Nest the entries and set the interval of each."""
+        stack = []
+        for entry in self.entries:
+            entry.word_start = self.word_position(entry.start)
+            while stack and stack[-1].level >= entry.level:
+                closed = stack.pop()
+                closed.end = entry.start
+                closed.word_end = entry.word_start
+            if stack:
+                entry.parent = stack[-1]
+                stack[-1].children.append(entry)
+            else:
+                self.roots.append(entry)
+            stack.append(entry)
+        total_words = len(self._concordance) if stack else 0
+        for entry in stack:
+            entry.end = len(self.text)
+            entry.word_end = total_words
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def word_position(self, offset):
+        """Cumulative word count at a character offset of the text.
+
+        Parameters
+        ----------
+        offset : int
+            Character offset.
+
+        Returns
+        -------
+        position : int
+            Number of words that end at or before ``offset``.
+        """
+        if self._concordance is None:
+            return 0
+        return self._concordance.position_at(offset)
+
+    def containing(self, offset):
+        """Innermost section containing a character offset.
+
+        Parameters
+        ----------
+        offset : int
+            Character offset in the text.
+
+        Returns
+        -------
+        entry : :class:`OutlineEntry`
+            The section, or `None` if ``offset`` is before the first
+            sectioning command.
+        """
+        i = bisect_right(self._starts, offset) - 1
+        if i < 0:
+            return None
+        return self.entries[i]
+
+    def containing_word(self, position):
+        """Innermost section containing a cumulative word position.
+
+        Parameters
+        ----------
+        position : int
+            Cumulative word count (e.g., the ``position`` of a citation
+            from :meth:`paperweight.document.TexDocument.iter_citations`).
+
+        Returns
+        -------
+        entry : :class:`OutlineEntry`
+            The section, or `None` if ``position`` is before the first
+            sectioning command.
+        """
+        i = bisect_right(self._word_starts, position) - 1
+        if i < 0:
+            return None
+        return self.entries[i]
+
+    def filter(self, command, starred=None):
+        """List of entries of a sectioning command.
+
+        Parameters
+        ----------
+        command : str
+            Sectioning command (e.g., ``'section'``).
+        starred : bool
+            If `True` or `False`, only include starred or unstarred
+            commands; by default, include both.
+        """
+        return [entry for entry in self.entries
+                if entry.command == command
+                and (starred is None or entry.starred == starred)]
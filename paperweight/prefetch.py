@@ -0,0 +1,268 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Concurrent, non-blocking loading of LaTeX documents.
+
+A :class:`DocumentLoader` fetches the whole include tree of a document
+concurrently, with a bounded number of worker threads, before the document
+is built. The include tree is walked breadth-first: all documents at one
+level of the tree are read in parallel, their ``\\input`` commands are
+resolved, and then the next level is read. The fetched files are held by a
+:class:`PrefetchSource` so that building the document
+(:class:`paperweight.document.SourceTexDocument`) and inlining it do not
+touch the underlying storage again. Documents built this way are identical
+to those built by the blocking API.
+
+The ``*_async`` methods of :class:`DocumentLoader` return immediately with
+a :class:`multiprocessing.pool.AsyncResult`; CPU-heavy work such as
+tokenization for citation extraction runs on the loader's worker threads
+rather than the caller's thread. An
+event-driven server can pass a ``callback`` that hands the result back to
+its event loop (e.g., with ``loop.call_soon_threadsafe``)::
+
+    loader = DocumentLoader(max_workers=8)
+    loader.load_path_async('paper.tex', callback=on_document)
+"""
+
+import os
+from multiprocessing.pool import ThreadPool
+
+from .document import SourceTexDocument
+from .instrument import incr
+from .sources import TexSource, FilesystemSource
+from . import bytescan
+
+
+__all__ = ['DocumentLoader', 'PrefetchSource']
+
+
+class PrefetchSource(TexSource):
+    """A source that serves prefetched files from memory, and delegates
+    everything else to an underlying source.
+
+    Parameters
+    ----------
+    source : :class:`paperweight.sources.TexSource`
+        The underlying source.
+    """
+    def __init__(self, source):
+        super(PrefetchSource, self).__init__()
+        self.source = source
+        self.thread_safe = source.thread_safe
+        self._cache = {}
+
+    def add(self, path, data):
+        """Add the prefetched ``data`` of the file at ``path``."""
+        self._cache[path] = data
+
+    def read_bytes(self, path):
+        try:
+            data = self._cache[path]
+        except KeyError:
+            incr('prefetch_cache_misses')
+            return self.source.read_bytes(path)
+        incr('prefetch_cache_hits')
+        return data
+
+    def read_buffer(self, path):
+        try:
+            data = self._cache[path]
+        except KeyError:
+            incr('prefetch_cache_misses')
+            return self.source.read_buffer(path)
+        incr('prefetch_cache_hits')
+        return data
+
+    def exists(self, path):
+        if self._cache.get(path) is not None:
+            return True
+        return self.source.exists(path)
+
+    def list(self, base_dir=''):
+        return self.source.list(base_dir)
+
+    def content_id(self, path):
+        return self.source.content_id(path)
+
+    def dirname(self, path):
+        return self.source.dirname(path)
+
+    def find(self, name, base_dir=''):
+        return self.source.find(name, base_dir)
+
+    def find_bib(self, name, base_dir=''):
+        return self.source.find_bib(name, base_dir)
+
+    def bib_database(self, path):
+        return self.source.bib_database(path)
+
+
+class DocumentLoader(object):
+    """Loads documents by fetching their include trees concurrently.
+
+    Parameters
+    ----------
+    max_workers : int
+        Maximum number of worker threads, which bounds the number of
+        concurrent reads.
+    """
+    def __init__(self, max_workers=8):
+        super(DocumentLoader, self).__init__()
+        self.max_workers = max_workers
+        # Reads run on their own pool so that tasks waiting on reads can
+        # never starve the reads of workers.
+        self._pool = ThreadPool(max_workers)
+        self._io_pool = ThreadPool(max_workers)
+
+    def close(self):
+        """Stop the worker threads once pending work is done."""
+        for pool in (self._pool, self._io_pool):
+            pool.close()
+            pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def prefetch(self, source, path, base_dir=None):
+        """Fetch a document and its include tree.
+
+        Sources that are not thread-safe (``source.thread_safe`` is
+        `False`) are read sequentially.
+
+        Parameters
+        ----------
+        source : :class:`paperweight.sources.TexSource`
+            Storage of the document.
+        path : str
+            Path to the root document in the source.
+        base_dir : str
+            Directory that input documents are resolved against. Defaults
+            to the directory of the document at ``path``.
+
+        Returns
+        -------
+        source : :class:`PrefetchSource`
+            Source holding the fetched files.
+        """
+        if base_dir is None:
+            base_dir = source.dirname(path)
+        prefetched = PrefetchSource(source)
+        level = [path]
+        seen = set(level)
+        while len(level) > 0:
+            if source.thread_safe and len(level) > 1:
+                datas = self._io_pool.map(source.read_bytes, level)
+            else:
+                datas = [source.read_bytes(p) for p in level]
+            next_level = []
+            for p, data in zip(level, datas):
+                prefetched.add(p, data)
+                if data is None:
+                    continue
+                for name in bytescan.iter_input_names(data):
+                    child_path = source.find(name, base_dir)
+                    if child_path is not None and child_path not in seen:
+                        seen.add(child_path)
+                        next_level.append(child_path)
+            level = next_level
+        return prefetched
+
+    def load(self, source, path, base_dir=None):
+        """Load a document, fetching its include tree concurrently.
+
+        Parameters
+        ----------
+        source : :class:`paperweight.sources.TexSource`
+            Storage of the document.
+        path : str
+            Path to the root document in the source.
+        base_dir : str
+            Directory that input documents are resolved against. Defaults
+            to the directory of the document at ``path``.
+
+        Returns
+        -------
+        document : :class:`paperweight.document.SourceTexDocument`
+            The document.
+        """
+        prefetched = self.prefetch(source, path, base_dir=base_dir)
+        return SourceTexDocument(prefetched, path, recursive=True,
+                                 base_dir=base_dir)
+
+    def load_path(self, path):
+        """Load a document in the filesystem (see :meth:`load`)."""
+        return self.load(FilesystemSource(), os.path.abspath(path))
+
+    def load_async(self, source, path, base_dir=None, callback=None):
+        """Load a document without blocking (see :meth:`load`).
+
+        Parameters
+        ----------
+        callback : function
+            Function called, from a worker thread, with the document once
+            it is loaded.
+
+        Returns
+        -------
+        result : :class:`multiprocessing.pool.AsyncResult`
+            Pending :class:`paperweight.document.SourceTexDocument`.
+        """
+        return self._pool.apply_async(self.load, (source, path),
+                                      {'base_dir': base_dir},
+                                      callback=callback)
+
+    def load_path_async(self, path, callback=None):
+        """Load a document in the filesystem without blocking (see
+        :meth:`load_async`).
+        """
+        return self._pool.apply_async(self.load_path, (path,),
+                                      callback=callback)
+
+    def inline_async(self, document, callback=None):
+        """Inline the input documents of a document without blocking. The
+        document is modified in place (see
+        :meth:`paperweight.document.SourceTexDocument.inline_inputs`).
+
+        Parameters
+        ----------
+        document : :class:`paperweight.document.SourceTexDocument`
+            The document, usually loaded by this loader so that its inputs
+            are already fetched.
+        callback : function
+            Function called, from a worker thread, with the document's
+            inlined text.
+
+        Returns
+        -------
+        result : :class:`multiprocessing.pool.AsyncResult`
+            Pending inlined text.
+        """
+        return self._pool.apply_async(_inline, (document,),
+                                      callback=callback)
+
+    def citations_async(self, document, n_words=20, callback=None):
+        """Extract citation contexts on a worker thread (see
+        :meth:`paperweight.document.TexDocument.extract_citation_context`).
+
+        Parameters
+        ----------
+        callback : function
+            Function called, from a worker thread, with the citation
+            dictionary.
+
+        Returns
+        -------
+        result : :class:`multiprocessing.pool.AsyncResult`
+            Pending citation dictionary.
+        """
+        return self._pool.apply_async(document.extract_citation_context,
+                                      (n_words,), callback=callback)
+
+
+def _inline(document):
+    document.inline_inputs()
+    return document.text
@@ -0,0 +1,336 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Storage backends for LaTeX documents.
+
+A source provides the storage operations that paperweight needs to read a
+LaTeX project: reading a file's bytes, testing whether a file exists,
+listing files, identifying a file's content, and resolving the name of an
+input document (as written in ``\\input{...}``) to a path in the source.
+All document classes (:class:`paperweight.document.SourceTexDocument`) and
+the inliner (:func:`paperweight.texutils.inline_source`) are written
+against the :class:`TexSource` interface, so a new kind of storage, or a
+caching or prefetching layer, only needs to implement that interface.
+
+Sources provided by paperweight are:
+
+- :class:`FilesystemSource`, for files in the filesystem,
+- :class:`paperweight.gitio.GitTree`, for files in a git commit,
+- :class:`paperweight.archive.TexArchive`, for files in an archive,
+- :class:`MemorySource`, for files held in memory,
+- :class:`ChainSource`, which tries several sources in order.
+"""
+
+import os
+import hashlib
+import posixpath
+
+from .bibio import BibDatabase
+from .bytescan import map_file
+from .instrument import incr, timed
+from . import texpath
+
+
+__all__ = ['TexSource', 'FilesystemSource', 'MemorySource', 'ChainSource']
+
+
+class TexSource(object):
+    """Baseclass for a storage backend of LaTeX documents.
+
+    Paths in a source are strings whose meaning is defined by the source
+    (e.g., paths relative to the root of a git repository or archive).
+    Subclasses must implement :meth:`read_bytes`, :meth:`exists` and
+    :meth:`list`, and may override the other methods.
+
+    Attributes
+    ----------
+    thread_safe : bool
+        `True` if files may be read from several threads at once.
+    """
+    thread_safe = True
+
+    def read_bytes(self, path):
+        """Read the data of the file at ``path``, or `None` if it does not
+        exist.
+        """
+        raise NotImplementedError
+
+    def exists(self, path):
+        """`True` if a file exists at ``path``."""
+        raise NotImplementedError
+
+    def list(self, base_dir=''):
+        """List of the paths of all files in the directory ``base_dir``
+        (recursively).
+        """
+        raise NotImplementedError
+
+    def content_id(self, path):
+        """Identifier of the content of the file at ``path`` that changes
+        if the file's content changes, or `None` if the file does not exist.
+
+        The default implementation is the SHA1 hash of the file's data.
+        """
+        data = self.read_bytes(path)
+        if data is None:
+            return None
+        return hashlib.sha1(data).hexdigest()
+
+    def read_buffer(self, path):
+        """Read the raw data of the file at ``path`` for bytes-level
+        scanning (see :mod:`paperweight.bytescan`), or `None` if it does not
+        exist.
+
+        The data may be any buffer that bytes regular expressions can
+        search, such as a memory-mapped file. The default implementation
+        returns :meth:`read_bytes`.
+        """
+        return self.read_bytes(path)
+
+    def read(self, path):
+        """Read the text of the file at ``path`` as unicode, or `None` if
+        it does not exist. Files are decoded as UTF-8.
+        """
+        data = self.read_bytes(path)
+        if data is None:
+            return None
+        return data.decode('utf-8')
+
+    def dirname(self, path):
+        """Directory of the file at ``path``."""
+        return posixpath.dirname(path)
+
+    def find(self, name, base_dir=''):
+        """Resolve the name of an input document, relative to the
+        directory ``base_dir``, to a path in the source.
+
+        Parameters
+        ----------
+        name : str
+            Name of the file, as written in the LaTeX document (e.g.,
+            ``'sections/intro.tex'``).
+        base_dir : str
+            Directory that ``name`` is relative to; usually the directory
+            of the root document.
+
+        Returns
+        -------
+        path : str
+            Path of the file in the source, or `None` if it does not exist.
+        """
+        path = posixpath.normpath(posixpath.join(base_dir, name))
+        if self.exists(path):
+            return path
+        return None
+
+    def find_bib(self, name, base_dir=''):
+        """Resolve the name of a BibTeX bibliography to a path in the
+        source, or otherwise to an absolute path in the local texmf trees
+        (see :func:`paperweight.texpath.bib_search_path`).
+
+        Returns
+        -------
+        path : str
+            Path of the bibliography, or `None` if it cannot be found.
+        """
+        path = self.find(name, base_dir)
+        if path is not None:
+            return path
+        return texpath.bib_search_path().find(name)
+
+    def bib_database(self, path):
+        """Open the :class:`paperweight.bibio.BibDatabase` at a ``path``
+        returned by :meth:`find_bib`.
+        """
+        if self.exists(path):
+            return BibDatabase.from_bytes(self.read_bytes(path))
+        return BibDatabase(path)
+
+
+class FilesystemSource(TexSource):
+    """Files in the filesystem.
+
+    Input documents and bibliographies are resolved with kpathsea-style
+    search paths (see :mod:`paperweight.texpath`), and paths returned by
+    :meth:`find` are absolute.
+
+    Parameters
+    ----------
+    root : str
+        Directory that relative paths are relative to. Defaults to the
+        current working directory.
+    """
+    def __init__(self, root=None):
+        super(FilesystemSource, self).__init__()
+        self.root = root
+
+    def _abspath(self, path):
+        if self.root is not None:
+            path = os.path.join(self.root, path)
+        return os.path.abspath(path)
+
+    def read_bytes(self, path):
+        path = self._abspath(path)
+        try:
+            with timed('read', path=path) as t:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                t.annotate(bytes=len(data))
+        except IOError:
+            return None
+        incr('files_read')
+        incr('bytes_read', len(data))
+        return data
+
+    def read_buffer(self, path):
+        """Memory-map the file at ``path`` (see
+        :func:`paperweight.bytescan.map_file`).
+        """
+        return map_file(self._abspath(path))
+
+    def exists(self, path):
+        return os.path.isfile(self._abspath(path))
+
+    def list(self, base_dir=''):
+        """List of the absolute paths of all files in the directory
+        ``base_dir`` (recursively).
+        """
+        paths = []
+        for dirpath, dirlist, filelist in os.walk(self._abspath(base_dir)):
+            for name in filelist:
+                paths.append(os.path.join(dirpath, name))
+        return paths
+
+    def content_id(self, path):
+        """Identifier of the content of the file at ``path`` from its
+        modification time and size, or `None` if the file does not exist.
+        """
+        try:
+            st = os.stat(self._abspath(path))
+        except OSError:
+            return None
+        return (st.st_mtime, st.st_size)
+
+    def dirname(self, path):
+        return os.path.dirname(self._abspath(path))
+
+    def find(self, name, base_dir=''):
+        return texpath.tex_search_path(self._abspath(base_dir)).find(name)
+
+    def find_bib(self, name, base_dir=''):
+        return texpath.bib_search_path(self._abspath(base_dir)).find(name)
+
+    def bib_database(self, path):
+        return BibDatabase(self._abspath(path))
+
+
+class MemorySource(TexSource):
+    """Files held in memory.
+
+    Parameters
+    ----------
+    files : dict
+        Data of each file, as bytes or unicode (which is encoded as UTF-8),
+        keyed by path.
+    """
+    def __init__(self, files=None):
+        super(MemorySource, self).__init__()
+        self._files = {}
+        if files is not None:
+            for path, data in files.iteritems():
+                self.write(path, data)
+
+    def write(self, path, data):
+        """Write the ``data`` (bytes or unicode) of the file at ``path``."""
+        if isinstance(data, unicode):
+            data = data.encode('utf-8')
+        self._files[posixpath.normpath(path)] = data
+
+    def read_bytes(self, path):
+        return self._files.get(posixpath.normpath(path))
+
+    def exists(self, path):
+        return posixpath.normpath(path) in self._files
+
+    def list(self, base_dir=''):
+        return _list_prefix(self._files.keys(), base_dir)
+
+
+class ChainSource(TexSource):
+    """Several sources searched in order.
+
+    Files are resolved by the first source that has them. For example,
+    :func:`paperweight.texutils.inline_blob` chains a git commit with the
+    working tree, so that files not under version control are found.
+
+    Parameters
+    ----------
+    sources : list
+        The :class:`TexSource` instances, in search order.
+    """
+    def __init__(self, sources):
+        super(ChainSource, self).__init__()
+        self.sources = list(sources)
+        self.thread_safe = all(s.thread_safe for s in self.sources)
+
+    def _source_of(self, path):
+        for source in self.sources:
+            if source.exists(path):
+                return source
+        return None
+
+    def read_bytes(self, path):
+        source = self._source_of(path)
+        if source is None:
+            return None
+        return source.read_bytes(path)
+
+    def read_buffer(self, path):
+        source = self._source_of(path)
+        if source is None:
+            return None
+        return source.read_buffer(path)
+
+    def exists(self, path):
+        return self._source_of(path) is not None
+
+    def list(self, base_dir=''):
+        paths = []
+        for source in self.sources:
+            paths.extend(p for p in source.list(base_dir) if p not in paths)
+        return paths
+
+    def content_id(self, path):
+        source = self._source_of(path)
+        if source is None:
+            return None
+        return source.content_id(path)
+
+    def find(self, name, base_dir=''):
+        for source in self.sources:
+            path = source.find(name, base_dir)
+            if path is not None:
+                return path
+        return None
+
+    def find_bib(self, name, base_dir=''):
+        for source in self.sources:
+            path = source.find(name, base_dir)
+            if path is not None:
+                return path
+        return texpath.bib_search_path().find(name)
+
+    def bib_database(self, path):
+        source = self._source_of(path)
+        if source is None:
+            return BibDatabase(path)
+        return source.bib_database(path)
+
+
+def _list_prefix(paths, base_dir):
+    """Filter posix ``paths`` to those within the directory ``base_dir``."""
+    base_dir = posixpath.normpath(base_dir) if base_dir else ''
+    if base_dir in ('', '.'):
+        return sorted(paths)
+    prefix = base_dir + '/'
+    return sorted(p for p in paths if p.startswith(prefix))
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Tests of :mod:`paperweight.batch`.
+"""
+
+import os
+import codecs
+import threading
+
+import pytest
+
+from paperweight import texutils
+from paperweight.sources import FilesystemSource
+from paperweight.batch import inline_batch, inline_paths
+
+
+FILES = {
+    'main.tex': (u'\\documentclass{article}\n'
+                 u'\\begin{document}\n'
+                 u'% \\input{commented}\n'
+                 u'\\input{intro}\n'
+                 u'\\include{sections/methods}\n'
+                 u'\\InputIfFileExists{appendix}{\\clearpage}{}\n'
+                 u'\\InputIfFileExists{missing}{}{No appendix.}\n'
+                 u'\\input{notfound}\n'
+                 u'\\end{document}\n'),
+    'other.tex': (u'\\documentclass{article}\n'
+                  u'\\input{intro} 50\\% done % comment\n'
+                  u'\\input{intro}\n'),
+    'intro.tex': u'Introduction \\citep{A:2000}. % comment\n'
+                 u'\\input{sections/shared}\n',
+    'sections/methods.tex': u'Methods.\n\\input{sections/shared}\n',
+    'sections/shared.tex': u'Shared text, caf\xe9. % comment\n',
+    'appendix.tex': u'Appendix % comment\n',
+}
+
+
+@pytest.fixture
+def project(tmpdir):
+    """Directory of a LaTeX project, and paths of its root documents."""
+    base_dir = str(tmpdir)
+    for name, text in FILES.iteritems():
+        path = os.path.join(base_dir, name)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with codecs.open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+    paths = [os.path.join(base_dir, name)
+             for name in ('main.tex', 'other.tex', 'intro.tex')]
+    return base_dir, paths
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_inline_paths_matches_inline(project, processes):
+    base_dir, paths = project
+    expected = []
+    for path in paths:
+        with codecs.open(path, 'r', encoding='utf-8') as f:
+            expected.append(texutils.inline(f.read(), base_dir=base_dir))
+    assert inline_paths(paths, processes=processes) == expected
+
+
+def test_inline_paths_missing_document(project):
+    base_dir, paths = project
+    missing = os.path.join(base_dir, 'nonexistent.tex')
+    texts = inline_paths([missing] + paths[:1], processes=1)
+    assert texts[0] is None
+    assert texts[1] is not None
+
+
+class UnpicklableSource(FilesystemSource):
+    """A filesystem source that cannot be sent to worker processes."""
+    def __init__(self):
+        super(UnpicklableSource, self).__init__()
+        self._lock = threading.Lock()
+
+
+def test_inline_batch_unpicklable_source(project):
+    base_dir, paths = project
+    source = UnpicklableSource()
+    expected = inline_paths(paths, processes=1)
+    texts = inline_batch([(source, path) for path in paths], processes=2)
+    assert texts == expected
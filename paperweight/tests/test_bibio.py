@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Tests of :mod:`paperweight.bibio`.
+"""
+
+import logging
+
+from paperweight.bibio import BibDatabase
+
+
+BIB = (b'@string{jan = "January"}\n'
+       b'@comment{A comment with an @article{Fake:1, inside}\n'
+       b'\n'
+       b'@article{A:1,\n'
+       b'  title = {Nested {braces}},\n'
+       b'  month = jan,\n'
+       b'}\n'
+       b'@book{B:2, title = "Quoted {braces}"}\n'
+       b'@article(C:3,\n'
+       b'  title = {Parenthesis (delimited)},\n'
+       b'  note = "Unbalanced ) in quotes"\n'
+       b')\n'
+       b'@article{\n'
+       b'  D:4,\n'
+       b'  title = {Key on the next line},\n'
+       b'}\n'
+       b'@misc{E:5,\n'
+       b'  title = {A \\}\n'
+       b'}\n'
+       b'@misc{F:6, title = {After a backslash}}\n')
+
+
+def test_index_entries():
+    db = BibDatabase.from_bytes(BIB)
+    assert db.keys() == ['A:1', 'B:2', 'C:3', 'D:4', 'E:5', 'F:6']
+    assert db.read_entry('A:1') == (u'@article{A:1,\n'
+                                    u'  title = {Nested {braces}},\n'
+                                    u'  month = jan,\n'
+                                    u'}')
+    assert db.read_entry('B:2') == u'@book{B:2, title = "Quoted {braces}"}'
+    assert db.read_entry('C:3').startswith(u'@article(C:3,')
+    assert db.read_entry('C:3').endswith(u'in quotes"\n)')
+    assert db.read_entry('D:4').endswith(u'next line},\n}')
+    # Backslashes do not escape braces
+    assert db.read_entry('E:5') == u'@misc{E:5,\n  title = {A \\}\n}'
+    assert db.missing_keys(['A:1', 'Fake:1', 'jan']) == ['Fake:1', 'jan']
+
+
+def test_unbalanced_entry(caplog):
+    data = (b'@article{A:1,\n'
+            b'  title = {Unclosed,\n'
+            b'}\n'
+            b'@article{B:2, title = {Closed}}\n')
+    with caplog.at_level(logging.WARNING, logger='paperweight.bibio'):
+        db = BibDatabase.from_bytes(data)
+    # A line-initial @ starts a new entry even inside an unbalanced one
+    assert db.keys() == ['A:1', 'B:2']
+    assert db.read_entry('A:1') == u'@article{A:1,\n  title = {Unclosed,\n}\n'
+    assert db.read_entry('B:2') == u'@article{B:2, title = {Closed}}'
+    assert 'Unbalanced braces' in caplog.text
+
+
+def test_iter_entries():
+    db = BibDatabase.from_bytes(BIB)
+    keys = [k for k, _ in db.iter_entries(['F:6', 'A:1', 'Missing:0'])]
+    assert keys == ['A:1', 'F:6']
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Tests of :mod:`paperweight.document`.
+"""
+
+from paperweight import texutils
+from paperweight.document import TexDocument
+
+
+TEXT = (u'\\documentclass{article}\n'
+        u'% A long comment that adds many words before the first section,\n'
+        u'% so that word positions change when comments are removed.\n'
+        u'\\begin{document}\n'
+        u'\\section{A}\n'
+        u'First section \\citep{X:1}. % and a \\section{Commented}\n'
+        u'\\section*{Unnumbered}\n'
+        u'\\section{B}\n'
+        u'Second section \\citep{Y:2}.\n'
+        u'\\end{document}\n')
+
+
+def _citations(doc):
+    return [(key, c['position'], c['section'])
+            for key, c in doc.iter_citations(n_words=2)]
+
+
+def test_citation_sections():
+    citations = _citations(TexDocument(TEXT))
+    assert [(key, section[1]) for key, _, section in citations] \
+        == [(u'X:1', u'A'), (u'Y:2', u'B')]
+
+
+def test_sections_after_remove_comments():
+    doc = TexDocument(TEXT)
+    _citations(doc)
+    doc.remove_comments()
+    # Positions and sections are those of the text without comments
+    expected = _citations(TexDocument(texutils.remove_comments(TEXT)))
+    assert _citations(doc) == expected
+    assert [section[1] for _, _, section in expected] == [u'A', u'B']
+    assert doc.sections == [(expected[0][2][0], u'A'),
+                            (expected[1][2][0], u'B')]
+
+
+def test_sections_after_text_change():
+    doc = TexDocument(TEXT)
+    _citations(doc)
+    text = u'\\section{C}\nNew text \\citep{Z:3}.\n'
+    doc.text = text
+    assert _citations(doc) == _citations(TexDocument(text))
+    assert _citations(doc)[0][2] == (0, u'C')
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Tests of :mod:`paperweight.gitdiff` and :class:`paperweight.gitio.GitTree`.
+"""
+
+import os
+import codecs
+import subprocess
+
+import pytest
+
+from paperweight import gitio
+from paperweight.gitdiff import diff_commits
+
+
+DATA = (u'\\section{Data}\n'
+        u'We observed the galaxies with the telescope \\citep{A:1}, and\n'
+        u'reduced the images with the standard pipeline \\citep{B:2}.\n')
+
+MAIN_A = (u'\\documentclass{article}\n'
+          u'\\begin{document}\n'
+          u'\\input{intro}\n' + DATA +
+          u'\\end{document}\n')
+
+# Background is inserted before Data, which is renamed
+MAIN_B = (u'\\documentclass{article}\n'
+          u'\\begin{document}\n'
+          u'\\input{intro}\n'
+          u'\\section{Background}\n'
+          u'Earlier surveys were shallow \\citep{C:3}.\n' +
+          DATA.replace(u'{Data}', u'{Data and methods}') +
+          u'\\end{document}\n')
+
+INTRO = u'\\section{Introduction}\nGalaxies \\citep{D:4}.\n'
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    gitio.clear_cache()
+    yield
+    gitio.clear_cache()
+
+
+def _commit(repo_dir, files):
+    for path, text in files.iteritems():
+        path = os.path.join(repo_dir, path)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with codecs.open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+    git = ['git', '-C', repo_dir, '-c', 'user.name=Test',
+           '-c', 'user.email=test@example.com']
+    subprocess.check_call(git + ['add', '.'])
+    subprocess.check_call(git + ['commit', '-q', '-m', 'Commit'])
+    return subprocess.check_output(git + ['rev-parse', 'HEAD']).strip()
+
+
+@pytest.fixture
+def repo(tmpdir):
+    repo_dir = str(tmpdir)
+    subprocess.check_call(['git', 'init', '-q', repo_dir])
+    ref_a = _commit(repo_dir, {'paper/main.tex': MAIN_A,
+                               'paper/intro.tex': INTRO,
+                               'other/notes.txt': u'Notes\n'})
+    ref_b = _commit(repo_dir, {'paper/main.tex': MAIN_B})
+    return repo_dir, ref_a, ref_b
+
+
+def test_diff_commits(repo):
+    repo_dir, ref_a, ref_b = repo
+    diff = diff_commits('paper/main.tex', ref_a, ref_b, repo_dir=repo_dir)
+    assert diff.changed_paths == ['paper/main.tex']
+    assert diff.added_paths == []
+    assert diff.removed_paths == []
+    assert diff.added_keys == ['C:3']
+    assert diff.removed_keys == []
+    assert diff.renamed_sections == [
+        ('paper/main.tex', u'Data', u'Data and methods')]
+    assert diff.added_sections == [('paper/main.tex', u'Background')]
+    assert diff.removed_sections == []
+    # Citations in the renamed section are not moved
+    assert diff.moved_citations == []
+
+
+def test_git_tree(repo):
+    repo_dir, ref_a, ref_b = repo
+    tree_a = gitio.git_tree(ref_a, repo_dir=repo_dir)
+    tree_b = gitio.git_tree(ref_b, repo_dir=repo_dir)
+    assert tree_a.exists('paper/intro.tex')
+    assert tree_a.exists('paper/../paper/intro.tex')
+    assert not tree_a.exists('paper')
+    assert not tree_a.exists('paper/missing.tex')
+    assert not tree_a.exists('missing/intro.tex')
+    assert tree_a.read('paper/main.tex') == MAIN_A
+    assert tree_a.find('intro.tex', 'paper') == 'paper/intro.tex'
+    assert tree_a.blob_sha('paper/intro.tex') \
+        == tree_b.blob_sha('paper/intro.tex')
+    assert tree_a.list('paper') == ['paper/intro.tex', 'paper/main.tex']
+    assert sorted(tree_a.paths()) == ['other/notes.txt', 'paper/intro.tex',
+                                      'paper/main.tex']
+    assert not tree_a.exists('paper/missing.tex')
+    assert tree_a.changed_paths(tree_b) == set(['paper/main.tex'])
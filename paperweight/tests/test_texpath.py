@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Tests of :mod:`paperweight.texpath`.
+"""
+
+import os
+
+import pytest
+
+from paperweight import texpath
+
+
+def _touch(*parts):
+    path = os.path.join(*parts)
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    with open(path, 'w') as f:
+        f.write('')
+    return path
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    texpath.clear_cache()
+    yield
+    texpath.clear_cache()
+
+
+@pytest.fixture
+def texmf(tmpdir, monkeypatch):
+    """An empty local texmf tree, and no TEXINPUTS."""
+    home = str(tmpdir.join('texmf'))
+    monkeypatch.setenv('TEXMFHOME', home)
+    monkeypatch.delenv('TEXMFLOCAL', raising=False)
+    monkeypatch.delenv('TEXINPUTS', raising=False)
+    monkeypatch.setenv('HOME', str(tmpdir.join('home')))
+    return home
+
+
+def test_search_order(tmpdir):
+    first = _touch(str(tmpdir), 'a', 'x.tex')
+    _touch(str(tmpdir), 'b', 'x.tex')
+    only_b = _touch(str(tmpdir), 'b', 'y.tex')
+    search_path = texpath.SearchPath([str(tmpdir.join('a')),
+                                      str(tmpdir.join('b'))])
+    assert search_path.find('x.tex') == first
+    assert search_path.find('y.tex') == only_b
+    assert search_path.find('z.tex') is None
+
+
+def test_relative_names(tmpdir):
+    path = _touch(str(tmpdir), 'doc', 'sections', 'intro.tex')
+    above = _touch(str(tmpdir), 'shared.tex')
+    search_path = texpath.SearchPath([str(tmpdir.join('doc'))])
+    assert search_path.find('sections/intro.tex') == path
+    assert search_path.find('../shared.tex') == above
+    # Directories are not files
+    assert search_path.find('sections') is None
+
+
+def test_recursive_directory(tmpdir):
+    nested = _touch(str(tmpdir), 'tree', 'a', 'b', 'deep.tex')
+    _touch(str(tmpdir), 'tree', '.hidden', 'hidden.tex')
+    flat = texpath.SearchPath([str(tmpdir.join('tree'))])
+    recursive = texpath.SearchPath([str(tmpdir.join('tree')) + '//'])
+    assert flat.find('deep.tex') is None
+    assert recursive.find('deep.tex') == nested
+    assert recursive.find('a/b/deep.tex') == nested
+    assert recursive.find('hidden.tex') is None
+
+
+def test_empty_entries_expand_to_defaults(tmpdir, texmf, monkeypatch):
+    base_dir = str(tmpdir.join('doc'))
+    extra = str(tmpdir.join('extra'))
+    in_doc = _touch(base_dir, 'x.tex')
+    in_extra = _touch(extra, 'x.tex')
+    in_texmf = _touch(texmf, 'tex', 'latex', 'pkg', 'y.tex')
+
+    monkeypatch.setenv('TEXINPUTS', extra + os.pathsep)
+    search_path = texpath.tex_search_path(base_dir)
+    assert search_path.dirs[0] == (extra, False)
+    assert search_path.dirs[1] == (base_dir, False)
+    assert search_path.find('x.tex') == in_extra
+    assert search_path.find('y.tex') == in_texmf
+
+    monkeypatch.setenv('TEXINPUTS', os.pathsep + extra)
+    search_path = texpath.tex_search_path(base_dir)
+    assert search_path.dirs[0] == (base_dir, False)
+    assert search_path.dirs[-1] == (extra, False)
+    assert search_path.find('x.tex') == in_doc
+
+    # Without an empty entry, the defaults are not searched
+    monkeypatch.setenv('TEXINPUTS', extra)
+    search_path = texpath.tex_search_path(base_dir)
+    assert search_path.dirs == [(extra, False)]
+    assert search_path.find('y.tex') is None
+
+
+def test_default_search_path(tmpdir, texmf):
+    base_dir = str(tmpdir.join('doc'))
+    in_doc = _touch(base_dir, 'x.tex')
+    _touch(texmf, 'tex', 'x.tex')
+    search_path = texpath.tex_search_path(base_dir)
+    assert search_path.find('x.tex') == in_doc
+
+
+def test_listings_are_cached(tmpdir, monkeypatch):
+    search_path = texpath.SearchPath([str(tmpdir)])
+    assert search_path.find('new.tex') is None
+    path = _touch(str(tmpdir), 'new.tex')
+    # The cached listing is trusted until it expires or is cleared
+    assert search_path.find('new.tex') is None
+    texpath.clear_cache()
+    assert search_path.find('new.tex') == path
+    monkeypatch.setattr(texpath, 'LISTING_TTL', 0.)
+    os.remove(path)
+    assert search_path.find('new.tex') is None
@@ -0,0 +1,276 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Kpathsea-style search paths for finding LaTeX inputs and bibliographies.
+
+A :class:`SearchPath` is an ordered list of directories, configured like
+the ``TEXINPUTS`` and ``BIBINPUTS`` environment variables used by TeX:
+
+- directories are separated by :data:`os.pathsep`,
+- a directory ending in ``//`` is searched recursively,
+- an empty entry (e.g., a leading or trailing separator) is replaced by the
+  default search path,
+- relative directories are relative to the document's directory.
+
+The default search path is the document's directory followed by the
+local texmf trees (``$TEXMFHOME`` or ``~/texmf``, ``~/Library/texmf`` and
+``$TEXMFLOCAL``).
+
+Finding a file lists only the directory that would contain it, and
+recursive directories are indexed once (much like a kpathsea ``ls-R``
+database), so that a lookup is a dictionary hit rather than a series of
+:func:`os.path.exists` calls. Cached listings are trusted for
+:data:`LISTING_TTL` seconds, and indexes of recursive directories for
+:data:`TREE_TTL` seconds; call :func:`clear_cache` to find files that
+were added or removed more recently.
+"""
+
+import os
+import time
+
+from .instrument import incr, timed
+
+
+__all__ = ['SearchPath', 'tex_search_path', 'bib_search_path', 'clear_cache',
+           'LISTING_TTL', 'TREE_TTL']
+
+
+# Seconds that a directory listing is trusted before it is listed again
+LISTING_TTL = 2.
+
+# Seconds that the index of a recursive directory is trusted before it is
+# rebuilt
+TREE_TTL = 300.
+
+# Listings of directories, as (listed at, file names) tuples keyed by
+# directory and type of its path
+_listing_cache = {}
+
+# Indexes of recursive directory trees, keyed by directory
+_tree_cache = {}
+
+# Search paths, keyed by their arguments and the environment variables
+# they depend on
+_search_path_cache = {}
+
+
+class SearchPath(object):
+    """An ordered list of directories to search for files.
+
+    Parameters
+    ----------
+    dirs : list
+        Directories to search, in order. Directories ending in ``//``
+        are searched recursively.
+    """
+    def __init__(self, dirs):
+        super(SearchPath, self).__init__()
+        self.dirs = []
+        for d in dirs:
+            recursive = d.endswith('//')
+            d = os.path.abspath(os.path.expanduser(d.rstrip('/') or '/'))
+            if (d, recursive) not in self.dirs:
+                self.dirs.append((d, recursive))
+
+    def find(self, name):
+        """Find a file in the search path.
+
+        Parameters
+        ----------
+        name : str
+            Name of the file, possibly including directories (e.g.,
+            ``'sections/intro.tex'``), as written in a LaTeX document.
+
+        Returns
+        -------
+        path : str
+            Absolute path to the first matching file in the search path,
+            or `None` if the file cannot be found.
+        """
+        name = os.path.normpath(name)
+        if os.path.isabs(name):
+            return name if os.path.isfile(name) else None
+        for d, recursive in self.dirs:
+            if recursive and not name.startswith(os.pardir):
+                # Paths above the search directories are not indexed
+                path = _find_in_tree(d, name)
+            else:
+                path = _find_in_dir(os.path.join(d, name))
+            if path is not None:
+                return path
+        return None
+
+    def exists(self, name):
+        """`True` if the file ``name`` can be found in the search path."""
+        return self.find(name) is not None
+
+
+def tex_search_path(base_dir=None):
+    """Search path for LaTeX input documents, configured by the
+    ``TEXINPUTS`` environment variable.
+
+    Parameters
+    ----------
+    base_dir : str
+        Directory of the root LaTeX document. If `None`, only the texmf
+        trees are searched by default.
+
+    Returns
+    -------
+    search_path : :class:`SearchPath`
+        The search path.
+    """
+    return _search_path('TEXINPUTS', base_dir, 'tex//')
+
+
+def bib_search_path(base_dir=None):
+    """Search path for BibTeX bibliography documents, configured by the
+    ``BIBINPUTS`` environment variable.
+
+    Parameters
+    ----------
+    base_dir : str
+        Directory of the root LaTeX document. If `None`, only the texmf
+        trees are searched by default.
+
+    Returns
+    -------
+    search_path : :class:`SearchPath`
+        The search path.
+    """
+    return _search_path('BIBINPUTS', base_dir, 'bibtex/bib//')
+
+
+def clear_cache():
+    """Clear the cached directory listings of all search paths."""
+    _listing_cache.clear()
+    _tree_cache.clear()
+    _search_path_cache.clear()
+
+
+def _search_path(env_var, base_dir, texmf_subdir):
+    """Build a search path from an environment variable, or get it from
+    the cache.
+    """
+    # Relative directories are relative to the working directory
+    if base_dir is not None:
+        base_dir = os.path.abspath(base_dir)
+        cwd = None
+    else:
+        cwd = os.getcwd()
+    key = (env_var, base_dir, texmf_subdir, os.environ.get(env_var),
+           tuple(_texmf_trees()), os.environ.get('HOME'), cwd)
+    try:
+        return _search_path_cache[key]
+    except KeyError:
+        search_path = _build_search_path(env_var, base_dir, texmf_subdir)
+        _search_path_cache[key] = search_path
+        return search_path
+
+
+def _build_search_path(env_var, base_dir, texmf_subdir):
+    """Build a search path from an environment variable."""
+    if base_dir is not None:
+        base_dir = os.path.abspath(base_dir)
+    defaults = [os.path.join(tree, texmf_subdir) for tree in _texmf_trees()]
+    if base_dir is not None:
+        defaults.insert(0, base_dir)
+
+    value = os.environ.get(env_var)
+    if value is None:
+        return SearchPath(defaults)
+    dirs = []
+    for entry in value.split(os.pathsep):
+        if entry == '':
+            dirs.extend(defaults)
+        elif base_dir is not None:
+            dirs.append(os.path.join(base_dir, entry))
+        else:
+            dirs.append(entry)
+    return SearchPath(dirs)
+
+
+def _texmf_trees():
+    """Local texmf trees."""
+    trees = [os.environ.get('TEXMFHOME', '~/texmf'), '~/Library/texmf']
+    if 'TEXMFLOCAL' in os.environ:
+        trees.append(os.environ['TEXMFLOCAL'])
+    return trees
+
+
+def _find_in_dir(path):
+    """Absolute path of the file at ``path``, or `None` if it does not
+    exist, looked up in the cached listing of its directory.
+    """
+    path = os.path.normpath(path)
+    dirname, fname = os.path.split(path)
+    if fname in _list_dir(dirname):
+        return path
+    return None
+
+
+def _list_dir(d):
+    """Cached set of the names of the files in a directory."""
+    # Names are listed as str or unicode, as the directory is given
+    key = (d, type(d))
+    now = time.time()
+    cached = _listing_cache.get(key)
+    if cached is not None and now - cached[0] < LISTING_TTL:
+        incr('texpath_cache_hits')
+        return cached[1]
+    incr('texpath_cache_misses')
+    with timed('texpath_index'):
+        try:
+            names = frozenset(
+                n for n in os.listdir(d)
+                if os.path.isfile(os.path.join(d, n)))
+        except OSError:
+            names = frozenset()
+    _listing_cache[key] = (now, names)
+    return names
+
+
+def _find_in_tree(d, name):
+    """Find a file in the cached index of a recursive directory tree."""
+    now = time.time()
+    cached = _tree_cache.get(d)
+    if cached is not None and now - cached[0] < TREE_TTL:
+        incr('texpath_cache_hits')
+        index = cached[1]
+    else:
+        incr('texpath_cache_misses')
+        with timed('texpath_index'):
+            index = _walk_dir(d)
+        _tree_cache[d] = (now, index)
+    relpaths, basenames = index
+    path = relpaths.get(name)
+    if path is None:
+        path = basenames.get(name)
+    return path
+
+
+def _walk_dir(d):
+    """List the files in a directory tree.
+
+    Returns
+    -------
+    relpaths : dict
+        Absolute paths of files, keyed by their path relative to ``d``.
+    basenames : dict
+        Absolute paths of files, keyed by their file name. If several files
+        share a name, the first one found is kept.
+    """
+    relpaths = {}
+    basenames = {}
+    for dirpath, dirnames, filenames in os.walk(d):
+        # Skip hidden directories (e.g., .git), as kpathsea does
+        dirnames[:] = sorted(n for n in dirnames if not n.startswith('.'))
+        reldir = os.path.relpath(dirpath, d)
+        for fname in filenames:
+            path = os.path.join(dirpath, fname)
+            if reldir == os.curdir:
+                relpaths[fname] = path
+            else:
+                relpaths[os.path.join(reldir, fname)] = path
+            basenames.setdefault(fname, path)
+    return relpaths, basenames
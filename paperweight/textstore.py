@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Shared, content-addressed storage of document text.
+
+Documents (:class:`paperweight.document.TexDocument`) hold their text in a
+:class:`TextBuffer`. Buffers are interned by a :class:`TextStore`: all
+documents whose text is the same, such as a chapter input by many root
+documents, reference a single buffer, so memory grows with the number of
+unique files rather than the number of references. Data derived from a
+text (its concordance, outline, or text without comments) is cached on
+the buffer and is also shared.
+
+Buffers are immutable. Editing a document (e.g., with
+:meth:`paperweight.document.TexDocument.remove_comments`) replaces the
+document's reference with the buffer of the new text, copy-on-write,
+leaving other documents unchanged.
+
+A :class:`TextRope` is a lazily flattened view of text made of segments of
+buffers, such as the text of a document tree
+(:attr:`paperweight.document.TexDocument.rope`). Segments reference the
+buffers' text rather than copying it; the rope is only joined into a
+single string when it is converted with ``unicode()``.
+"""
+
+import hashlib
+import threading
+from bisect import bisect_right
+from weakref import WeakValueDictionary
+
+from .instrument import incr
+
+
+__all__ = ['TextBuffer', 'TextStore', 'TextRope', 'default_store']
+
+
+class TextBuffer(object):
+    """Immutable text, identified by the SHA1 digest of its UTF-8 encoding.
+
+    Buffers should be created with :meth:`TextStore.intern` so that they
+    are shared.
+
+    Attributes
+    ----------
+    text : unicode
+        The text.
+    digest : str
+        Hex SHA1 digest of the UTF-8 encoded text.
+    """
+    __slots__ = ('text', 'digest', '_derived', '__weakref__')
+
+    def __init__(self, text, digest):
+        self.text = text
+        self.digest = digest
+        self._derived = {}
+
+    def __len__(self):
+        return len(self.text)
+
+    def __repr__(self):
+        return '<TextBuffer {0} ({1:d} characters)>'.format(
+            self.digest[:7], len(self.text))
+
+    def derived(self, name, func):
+        """Data derived from the text, computed once with
+        ``func(text)`` and cached under ``name``.
+        """
+        try:
+            return self._derived[name]
+        except KeyError:
+            value = func(self.text)
+            self._derived[name] = value
+            return value
+
+
+class TextStore(object):
+    """Table of interned :class:`TextBuffer` instances, keyed by digest.
+
+    The table holds weak references: a buffer is freed once no document
+    references it.
+    """
+    def __init__(self):
+        super(TextStore, self).__init__()
+        self._buffers = WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._buffers)
+
+    def intern(self, text):
+        """Shared :class:`TextBuffer` of a unicode ``text``."""
+        if isinstance(text, TextBuffer):
+            return text
+        digest = hashlib.sha1(text.encode('utf-8')).hexdigest()
+        return self._intern(digest, lambda: text)
+
+    def intern_bytes(self, data):
+        """Shared :class:`TextBuffer` of UTF-8 encoded ``data``. The data is
+        only decoded if the store has no buffer of the same content.
+        """
+        digest = hashlib.sha1(data).hexdigest()
+        return self._intern(digest, lambda: data.decode('utf-8'))
+
+    def _intern(self, digest, make_text):
+        with self._lock:
+            buf = self._buffers.get(digest)
+            if buf is not None:
+                incr('text_store_hits')
+                return buf
+            incr('text_store_misses')
+            buf = TextBuffer(make_text(), digest)
+            self._buffers[digest] = buf
+            return buf
+
+
+# Store of the buffers of all documents
+default_store = TextStore()
+
+
+class TextRope(object):
+    """Text made of a sequence of segments, flattened lazily.
+
+    Parameters
+    ----------
+    segments : list
+        Segments of the text, in order. Each is a unicode string, a
+        :class:`TextBuffer`, a ``(buffer, start, end)`` tuple for the
+        characters ``start`` to ``end`` of a buffer, or a nested
+        :class:`TextRope`.
+    """
+    def __init__(self, segments):
+        super(TextRope, self).__init__()
+        self._segments = []
+        self._offsets = [0]
+        for segment in segments:
+            if isinstance(segment, TextBuffer):
+                segment = (segment, 0, len(segment))
+            elif isinstance(segment, basestring):
+                segment = (TextBuffer(segment, None), 0, len(segment))
+            if _length(segment) == 0:
+                continue
+            self._segments.append(segment)
+            self._offsets.append(self._offsets[-1] + _length(segment))
+        self._text = None
+
+    def __len__(self):
+        return self._offsets[-1]
+
+    def __unicode__(self):
+        if self._text is None:
+            self._text = u''.join(self.iter_pieces())
+        return self._text
+
+    def __eq__(self, other):
+        if isinstance(other, TextRope):
+            other = unicode(other)
+        return unicode(self) == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    def iter_pieces(self):
+        """Iterate over the text as unicode pieces, without joining them.
+        """
+        for segment in self._segments:
+            if isinstance(segment, TextRope):
+                for piece in segment.iter_pieces():
+                    yield piece
+            else:
+                buf, start, end = segment
+                if start == 0 and end == len(buf):
+                    yield buf.text
+                else:
+                    yield buf.text[start:end]
+
+    def __getitem__(self, index):
+        """A character, or a slice (as unicode) that is copied from the
+        segments it overlaps only.
+        """
+        if not isinstance(index, slice):
+            if index < 0:
+                index += len(self)
+            if not 0 <= index < len(self):
+                raise IndexError('TextRope index out of range')
+            return self[index:index + 1]
+        start, stop, step = index.indices(len(self))
+        if step != 1:
+            return unicode(self)[index]
+        if self._text is not None:
+            return self._text[start:stop]
+        pieces = []
+        i = bisect_right(self._offsets, start) - 1
+        while start < stop and i < len(self._segments):
+            seg_start = self._offsets[i]
+            seg_stop = self._offsets[i + 1]
+            lo = start - seg_start
+            hi = min(stop, seg_stop) - seg_start
+            segment = self._segments[i]
+            if isinstance(segment, TextRope):
+                pieces.append(segment[lo:hi])
+            else:
+                buf, seg_lo, _ = segment
+                pieces.append(buf.text[seg_lo + lo:seg_lo + hi])
+            start = seg_stop
+            i += 1
+        return u''.join(pieces)
+
+    def write(self, f):
+        """Write the text to a file object ``f``, piece by piece."""
+        for piece in self.iter_pieces():
+            f.write(piece)
+
+
+def _length(segment):
+    if isinstance(segment, TextRope):
+        return len(segment)
+    return segment[2] - segment[1]
@@ -6,18 +6,26 @@ Utilities for maniuplating latex documents.
 
 import os
 import re
-import codecs
 import fnmatch
 import logging
-from .gitio import read_git_blob
+from collections import namedtuple
+from .gitio import git_tree
+from .sources import FilesystemSource, ChainSource
+from .instrument import incr, timed
+from . import bytescan
 
 __all__ = ['find_root_tex_document', 'iter_tex_documents', 'inline',
-           'inline_blob', 'inline_bbl', 'remove_comments']
+           'inline_blob', 'inline_bbl', 'remove_comments', 'iter_bibitems',
+           'BibItem', 'read_text_file', 'inline_source', 'find_root_in_source',
+           'iter_input_names']
 
 
 # ? is non-greedy
 cite_pattern = re.compile(ur'\\cite((.*?)((\[.*?\])*)){(.*?)}', re.UNICODE)
 section_pattern = re.compile(ur'\\section{(.*?)}', re.UNICODE)
+sectioning_pattern = re.compile(
+    ur'\\(part|chapter|section|subsection|subsubsection)(\*?)'
+    ur'(?:\[[^\]]*\])?{(.*?)}', re.UNICODE)
 bib_pattern = re.compile(ur'\\bibliography{(.*?)}', re.UNICODE)
 input_pattern = re.compile(ur'\\input{(.*?)}', re.UNICODE)
 include_pattern = re.compile(ur'\\include{(.*?)}', re.UNICODE)
@@ -25,6 +33,29 @@ input_ifexists_pattern = re.compile(
     ur'\\InputIfFileExists{(.*)}{(.*)}{(.*)}',
     re.UNICODE)
 docclass_pattern = re.compile(ur'\\documentclass(.*?){(.*?)}', re.UNICODE)
+thebibliography_pattern = re.compile(
+    ur'\\begin{thebibliography}(.*?)\\end{thebibliography}',
+    re.UNICODE | re.DOTALL)
+bibitem_pattern = re.compile(
+    ur'\\bibitem\s*(?:\[(?P<label>[^\]]*)\])?\s*{(?P<key>[^}]*)}',
+    re.UNICODE)
+
+
+BibItem = namedtuple('BibItem', ['key', 'label', 'start', 'end'])
+"""A ``\\bibitem`` entry parsed by :func:`iter_bibitems`.
+
+Attributes
+----------
+key : unicode
+    Cite key of the entry.
+label : unicode
+    Optional label of the entry (e.g., ``\\bibitem[label]{key}``), or `None`.
+start : int
+    Character offset where the body of the entry begins (just after
+    the ``\\bibitem`` command).
+end : int
+    Character offset where the body of the entry ends.
+"""
 
 
 def find_root_tex_document(base_dir="."):
@@ -45,11 +76,10 @@ def find_root_tex_document(base_dir="."):
     """
     log = logging.getLogger(__name__)
     for tex_path in iter_tex_documents(base_dir=base_dir):
-        with codecs.open(tex_path, 'r', encoding='utf-8') as f:
-            text = f.read()
-            if len(docclass_pattern.findall(text)) > 0:
-                log.debug("Found root tex {0}".format(tex_path))
-                return tex_path
+        data = bytescan.map_file(tex_path)
+        if data is not None and bytescan.has_documentclass(data):
+            log.debug("Found root tex {0}".format(tex_path))
+            return tex_path
     log.warning("Could not find a root .tex file")
     raise RootNotFound
 
@@ -101,7 +131,9 @@ def inline(root_text,
         Text to process (and include in-lined files).
     base_dir : str
         Base directory of file containing ``root_text``. Defaults to the
-        current working directory.
+        current working directory. Input files are found in the
+        ``TEXINPUTS`` search path relative to this directory (see
+        :func:`paperweight.texpath.tex_search_path`).
     replacer : function
         Function called by :func:`re.sub` to replace ``\input`` expressions
         with a latex document. Changeable only for testing purposes.
@@ -115,60 +147,17 @@ def inline(root_text,
     txt : unicode
         Text with referenced files included.
     """
-    def _sub_line(match):
-        """Function to be used with re.sub to inline files for each match."""
-        fname = match.group(1)
-        if not fname.endswith('.tex'):
-            full_fname = ".".join((fname, 'tex'))
-        else:
-            full_fname = fname
-        full_path = os.path.abspath(os.path.join(base_dir, full_fname))
-        try:
-            with codecs.open(full_path, 'r', encoding='utf-8') as f:
-                included_text = f.read()
-        except IOError:
-            # TODO actually do logging here
-            print("Cannot open {0} for in-lining".format(full_path))
-            return u""
-        else:
-            # Recursively inline files
-            included_text = inline(included_text, base_dir=base_dir)
-            return included_text
-
-    def _sub_line_ifexists(match):
-        """Function to be used with re.sub for the input_ifexists_pattern."""
-        fname = match.group(1)
-        if not fname.endswith('.tex'):
-            full_fname = ".".join((fname, 'tex'))
-        else:
-            full_fname = fname
-        full_path = os.path.abspath(os.path.join(base_dir, full_fname))
-
-        if os.path.exists(full_path):
-            with codecs.open(full_path, 'r', encoding='utf-8') as f:
-                included_text = f.read()
-            # Append extra info after input
-            included_text = "\n".join((included_text, match.group(2)))
-        else:
-            # Use the fall-back clause in InputIfExists
-            included_text = match.group(3)
-        # Recursively inline files
-        included_text = inline(included_text, base_dir=base_dir)
-        return included_text
-
-    # Text processing pipline
-    result = remove_comments(root_text)
-    result = input_pattern.sub(_sub_line, result)
-    result = include_pattern.sub(_sub_line, result)
-    result = input_ifexists_pattern.sub(_sub_line_ifexists, result)
-    return result
+    return inline_source(FilesystemSource(), root_text, base_dir=base_dir,
+                         replacer=replacer,
+                         ifexists_replacer=ifexists_replacer)
 
 
 def inline_blob(commit_ref, root_text, base_dir='.', repo_dir=""):
     """Inline all input latex files that exist as git blobs in a tree object.
 
     The inlining is accomplished recursively. All files are opened as UTF-8
-    unicode files.
+    unicode files. Files that are not in the commit are read from the
+    working tree, if they exist there.
 
     Parameters
     ----------
@@ -186,66 +175,142 @@ def inline_blob(commit_ref, root_text, base_dir='.', repo_dir=""):
     txt : unicode
         Text with referenced files included.
     """
-    def _sub_blob(match):
+    source = ChainSource([git_tree(commit_ref, repo_dir=repo_dir),
+                          FilesystemSource(root=repo_dir)])
+    return inline_source(source, root_text, base_dir=base_dir)
+
+
+def inline_source(source, root_text, base_dir='',
+                  replacer=None,
+                  ifexists_replacer=None):
+    """Inline all input latex files that exist in a source (see
+    :mod:`paperweight.sources`).
+
+    The inlining is accomplished recursively. All files are read as UTF-8
+    unicode files.
+
+    Parameters
+    ----------
+    source : :class:`paperweight.sources.TexSource`
+        Storage of the latex files.
+    root_text : unicode
+        Text of tex document where referenced files will be inlined.
+    base_dir : str
+        Directory of the root tex document, in the source.
+    replacer : function
+        Function called by :func:`re.sub` to replace ``\input`` expressions
+        with a latex document. Changeable only for testing purposes.
+    ifexists_replacer : function
+        Function called by :func:`re.sub` to replace ``\InputIfExists``
+        expressions with a latex document. Changeable only for
+        testing purposes.
+
+    Returns
+    -------
+    txt : unicode
+        Text with referenced files included.
+    """
+    def _sub_line(match):
         """Function to be used with re.sub to inline files for each match."""
         fname = match.group(1)
         if not fname.endswith('.tex'):
             full_fname = ".".join((fname, 'tex'))
         else:
             full_fname = fname
-        git_rel_path = os.path.relpath(full_fname, base_dir)
-        included_text = read_git_blob(commit_ref, git_rel_path,
-                                      repo_dir=repo_dir)
-        if included_text is None:
-            # perhaps file is not in VC
-            # FIXME need to deal with possibility
-            # it does not exist there either
-            with codecs.open(full_fname, 'r', encoding='utf-8') as f:
-                included_text = f.read()
+        path = source.find(full_fname, base_dir)
+        if path is None:
+            log = logging.getLogger(__name__)
+            log.warning("Cannot find {0} for in-lining".format(full_fname))
+            return u""
+        included_text = source.read(path)
         # Recursively inline files
-        included_text = inline_blob(commit_ref, included_text,
-                                    base_dir=base_dir,
-                                    repo_dir=repo_dir)
-        return included_text
+        return inline_source(source, included_text, base_dir=base_dir)
 
-    def _sub_blob_ifexists(match):
+    def _sub_line_ifexists(match):
         """Function to be used with re.sub for the input_ifexists_pattern."""
         fname = match.group(1)
         if not fname.endswith('.tex'):
             full_fname = ".".join((fname, 'tex'))
         else:
             full_fname = fname
+        path = source.find(full_fname, base_dir)
 
-        # full_fname is relative to the root_path
-        # Make path relative to git repo root
-        git_rel_path = os.path.relpath(
-            os.path.join(repo_dir, base_dir, full_fname),
-            repo_dir)
-
-        included_text = read_git_blob(commit_ref, git_rel_path,
-                                      repo_dir=repo_dir)
-        if included_text is not None:
+        if path is not None:
+            included_text = source.read(path)
             # Append extra info after input
             included_text = "\n".join((included_text, match.group(2)))
-
-        if included_text is None:
+        else:
             # Use the fall-back clause in InputIfExists
             included_text = match.group(3)
-
         # Recursively inline files
-        included_text = inline_blob(commit_ref, included_text,
-                                    base_dir=base_dir,
-                                    repo_dir=repo_dir)
-        return included_text
+        return inline_source(source, included_text, base_dir=base_dir)
+
+    if replacer is None:
+        replacer = _sub_line
+    if ifexists_replacer is None:
+        ifexists_replacer = _sub_line_ifexists
 
     # Text processing pipline
-    result = remove_comments(root_text)
-    result = input_pattern.sub(_sub_blob, result)
-    result = include_pattern.sub(_sub_blob, result)
-    result = input_ifexists_pattern.sub(_sub_blob_ifexists, result)
+    with timed('inline', base_dir=base_dir, chars=len(root_text)):
+        result = remove_comments(root_text)
+        result = input_pattern.sub(replacer, result)
+        result = include_pattern.sub(replacer, result)
+        result = input_ifexists_pattern.sub(ifexists_replacer, result)
     return result
 
 
+def find_root_in_source(source, base_dir=''):
+    """Find the tex document in a source (see :mod:`paperweight.sources`)
+    that can be considered a root, by searching contents for
+    ``'\documentclass'``.
+
+    Parameters
+    ----------
+    source : :class:`paperweight.sources.TexSource`
+        Storage of the latex files.
+    base_dir : str
+        Directory of the source to search for LaTeX documents.
+
+    Returns
+    -------
+    tex_path : str
+        Path to the root tex document in the source.
+    """
+    log = logging.getLogger(__name__)
+    for tex_path in source.list(base_dir):
+        if not tex_path.endswith('.tex'):
+            continue
+        data = source.read_buffer(tex_path)
+        if data is not None and bytescan.has_documentclass(data):
+            log.debug("Found root tex {0}".format(tex_path))
+            return tex_path
+    log.warning("Could not find a root .tex file")
+    raise RootNotFound
+
+
+def iter_input_names(tex):
+    """Iterate over the names of files input by a latex document with
+    ``\\input``, ``\\include`` or ``\\InputIfFileExists``.
+
+    Parameters
+    ----------
+    tex : unicode
+        The latex manuscript.
+
+    Yields
+    ------
+    name : unicode
+        File name as written in the document, with a ``.tex`` extension
+        added if it has none.
+    """
+    for pattern in (input_pattern, include_pattern, input_ifexists_pattern):
+        for match in pattern.finditer(tex):
+            fname = match.group(1)
+            if not fname.endswith('.tex'):
+                fname = ".".join((fname, 'tex'))
+            yield fname
+
+
 def remove_comments(tex):
     """Delete latex comments from a manuscript.
 
@@ -260,4 +325,62 @@ def remove_comments(tex):
         The manuscript without comments.
     """
     # Expression via http://stackoverflow.com/a/13365453
-    return re.sub(ur'(?<!\\)%.*\n', ur'', tex)
+    with timed('comments'):
+        return re.sub(ur'(?<!\\)%.*\n', ur'', tex)
+
+
+def read_text_file(path):
+    """Read a UTF-8 encoded text file.
+
+    Parameters
+    ----------
+    path : str
+        Path to the file.
+
+    Returns
+    -------
+    text : unicode
+        Text of the file.
+    """
+    with timed('read', path=path) as t:
+        with open(path, 'rb') as f:
+            data = f.read()
+        t.annotate(bytes=len(data))
+        text = data.decode('utf-8')
+    incr('files_read')
+    incr('bytes_read', len(data))
+    return text
+
+
+def iter_bibitems(tex):
+    """Iterate over ``\\bibitem`` entries of ``thebibliography``
+    environments, such as those in a compiled bibliography (.bbl) inlined
+    with :func:`inline_bbl`.
+
+    Entries are segmented in a single pass: the body of each entry runs
+    from the end of its ``\\bibitem`` command to the start of the next
+    ``\\bibitem``, or the end of the ``thebibliography`` environment.
+    If the text has no ``thebibliography`` environment, all ``\\bibitem``
+    commands in the text are parsed.
+
+    Parameters
+    ----------
+    tex : unicode
+        The latex manuscript.
+
+    Yields
+    ------
+    bibitem : :class:`BibItem`
+        The parsed entry. Use ``tex[bibitem.start:bibitem.end]`` to get the
+        entry's body.
+    """
+    envs = [(m.start(1), m.end(1))
+            for m in thebibliography_pattern.finditer(tex)]
+    if len(envs) == 0:
+        envs = [(0, len(tex))]
+    for env_start, env_end in envs:
+        matches = list(bibitem_pattern.finditer(tex, env_start, env_end))
+        ends = [m.start() for m in matches[1:]] + [env_end]
+        for match, end in zip(matches, ends):
+            yield BibItem(match.group('key').strip(), match.group('label'),
+                          match.end(), end)
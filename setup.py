@@ -34,6 +34,7 @@ setup(
     long_description=long_description,
     packages=find_packages(),
     install_requires=['GitPython', 'pytest'],
+    extras_require={'parquet': ['pyarrow'], 'npz': ['numpy']},
     url='https://github.com/jonathansick/paperweight',
     download_url='',
 